@@ -0,0 +1,11 @@
+import time
+
+def best_of(f, repeat=3):
+    # best wall time of repeat calls to f, in seconds
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
@@ -0,0 +1,21 @@
+"""
+Grammar construction from scratch vs. loading the cached parsing table.
+
+    python -m benchmarks.bench_cache
+"""
+import tempfile
+
+from slang.stlc import grammar as stlc_grammar
+from slang.sysf import grammar as sysf_grammar
+from benchmarks._util import best_of
+
+def main():
+    with tempfile.TemporaryDirectory() as d:
+        for (name, mk_grammar) in [("stlc", stlc_grammar.mk_grammar), ("sysf", sysf_grammar.mk_grammar)]:
+            mk_grammar(d)
+            t_build = best_of(lambda: mk_grammar(), 5)
+            t_cached = best_of(lambda: mk_grammar(d), 5)
+            print(F"{name:5} build {t_build * 1000:8.2f}ms  cached {t_cached * 1000:8.2f}ms  x{t_build / t_cached:.2f}")
+
+if __name__ == "__main__":
+    main()
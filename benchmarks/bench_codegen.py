@@ -0,0 +1,36 @@
+"""
+Generated parser module vs. the interpreted Grammar.parse on sysf.
+
+    python -m benchmarks.bench_codegen
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+
+from slang.slr_codegen import bind
+from slang.sysf.grammar import mk_grammar
+from slang.sysf.lexer import lex
+from benchmarks.inputs import sysf_source
+from benchmarks._util import best_of
+
+def main(n: int = 2000):
+    g = mk_grammar()
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "sysf_parser.py")
+        with open(path, "w") as f:
+            f.write(g.generate_module())
+        spec = importlib.util.spec_from_file_location("sysf_parser", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    parse = bind(module, g.rules, g.matcher)
+    small = lex(sysf_source(20))
+    assert parse(small) == g.parse(iter(small), tranx=True)
+    toks = lex(sysf_source(n))
+    t_interp = best_of(lambda: g.parse(iter(toks), tranx=True))
+    t_gen = best_of(lambda: parse(toks))
+    print(F"sysf {len(toks):>8} tokens  interpreted {len(toks) / t_interp:10.0f} tok/s"
+          F"  generated {len(toks) / t_gen:10.0f} tok/s  x{t_interp / t_gen:.2f}")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
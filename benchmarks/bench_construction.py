@@ -0,0 +1,123 @@
+"""
+Table construction time and peak memory per phase on synthetic grammars of
+growing size: expression towers of n precedence levels, n-way alternations
+and n deep nonterminal chains. Total build time must grow at most
+polynomially with the degree below.
+
+    python -m benchmarks.bench_construction [sizes...]
+"""
+import gc
+import math
+import sys
+import time
+import tracemalloc
+
+from slang.slr import NonTerminal, Terminal, EOF, SLR, LALR, LR1
+from slang.slr_impl import (
+    ItemTable, Rule, _compute_assoc_preced_mapping, _compute_firsts, _compute_follows,
+    _compute_lalr_reduces, _compute_lr1_reduces, _compute_lr1_states, _compute_nt_closure_cache,
+    _compute_nullable, _compute_occurrences, _compute_parsing_table, _compute_slr_reduces,
+    _compute_states,
+)
+
+SIZES = [25, 50, 100, 200]
+MAX_DEGREE = 2.5
+
+def tower(n: int):
+    # E0 := E0 op0 E1 | E1, ..., En := ( E0 ) | val
+    es = [NonTerminal(F"E{i}") for i in range(n + 1)]
+    (lp, rp, val) = (Terminal("("), Terminal(")"), Terminal("val"))
+    rules = [(NonTerminal("G"), [es[0], EOF])]
+    for i in range(n):
+        rules.append((es[i], [es[i], Terminal(F"op{i}"), es[i + 1]]))
+        rules.append((es[i], [es[i + 1]]))
+    rules += [(es[n], [lp, es[0], rp]), (es[n], [val])]
+    return rules
+
+def wide(n: int):
+    # S := A0 | ... | An-1, Ai := ti S | ui
+    S = NonTerminal("S")
+    rules = [(NonTerminal("G"), [S, EOF])]
+    for i in range(n):
+        a = NonTerminal(F"A{i}")
+        rules += [(S, [a]), (a, [Terminal(F"t{i}"), S]), (a, [Terminal(F"u{i}")])]
+    return rules
+
+def chain(n: int):
+    # C0 := C1 | t0 C1, ..., Cn := val
+    cs = [NonTerminal(F"C{i}") for i in range(n + 1)]
+    rules = [(NonTerminal("G"), [cs[0], EOF])]
+    for i in range(n):
+        rules += [(cs[i], [cs[i + 1]]), (cs[i], [Terminal(F"t{i}"), cs[i + 1]])]
+    rules.append((cs[n], [Terminal("val")]))
+    return rules
+
+def phases(rules, mode, measure) -> int:
+    """
+    The steps of Grammar._build, each run through measure(name, f) -> f().
+    Returns the number of states.
+    """
+    rules = [Rule(i, nt, pattern) for (i, (nt, pattern)) in enumerate(rules)]
+    items = measure("items", lambda: ItemTable(rules))
+    occurrences = _compute_occurrences(items)
+    nullable = _compute_nullable(items, occurrences)
+    firsts = measure("firsts", lambda: _compute_firsts(items, nullable))
+    if mode == LR1:
+        (states, transitions) = measure("states", lambda: _compute_lr1_states(items, firsts, nullable, rules[0]))
+        reduces = measure("lookaheads", lambda: _compute_lr1_reduces(states))
+    else:
+        closure_cache = measure("closures", lambda: _compute_nt_closure_cache(items))
+        (states, transitions) = measure("states", lambda: _compute_states(items, closure_cache, rules[0]))
+        if mode == SLR:
+            follows = measure("follows", lambda: _compute_follows(items, occurrences, firsts, nullable))
+            reduces = measure("lookaheads", lambda: _compute_slr_reduces(states, follows))
+        else:
+            reduces = measure("lookaheads", lambda: _compute_lalr_reduces(states, transitions, firsts, nullable))
+    assoc_preced_defs = _compute_assoc_preced_mapping(rules, [])
+    measure("table", lambda: _compute_parsing_table(states, transitions, reduces, assoc_preced_defs))
+    return len(states)
+
+def profile(rules, mode):
+    # (states, {phase: seconds}, {phase: peak bytes}), timed without tracemalloc
+    times = {}
+    peaks = {}
+
+    def _time(name, f):
+        t0 = time.perf_counter()
+        res = f()
+        times[name] = time.perf_counter() - t0
+        return res
+
+    def _trace(name, f):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        res = f()
+        peaks[name] = tracemalloc.get_traced_memory()[1] - base
+        return res
+
+    gc.collect()
+    n_states = phases(rules, mode, _time)
+    tracemalloc.start()
+    try:
+        phases(rules, mode, _trace)
+    finally:
+        tracemalloc.stop()
+    return (n_states, times, peaks)
+
+def main(sizes=SIZES):
+    for (name, mk_rules) in [("tower", tower), ("wide", wide), ("chain", chain)]:
+        for mode in (SLR, LALR, LR1):
+            totals = []
+            for n in sizes:
+                (n_states, times, peaks) = profile(mk_rules(n), mode)
+                totals.append(sum(times.values()))
+                cols = "  ".join(
+                    F"{phase} {times[phase] * 1000:7.2f}ms {peaks[phase] / 1024:7.0f}K"
+                    for phase in times
+                )
+                print(F"{name:5} {mode.mode:4} n={n:<5} {n_states:6} states  total {totals[-1] * 1000:8.2f}ms  {cols}")
+            degree = math.log(totals[-1] / totals[0]) / math.log(sizes[-1] / sizes[0])
+            assert degree < MAX_DEGREE, F"{name} {mode.mode} construction grows as n^{degree:.2f}"
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,51 @@
+"""
+Parsing to de Bruijn indexed terms: parse then to_dbi against the fused
+DbiParser, time and peak memory. Sources are kept under the recursion
+limit of to_dbi.
+
+    python -m benchmarks.bench_dbi [n]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from slang.stlc import grammar as stlc_grammar, lexer as stlc_lexer, syntax as stlc_syntax
+from slang.sysf import grammar as sysf_grammar, lexer as sysf_lexer, syntax as sysf_syntax
+from benchmarks.inputs import stlc_source, sysf_source
+
+N = 100
+REPEAT = 20
+
+def measure(f):
+    # (best seconds, peak bytes)
+    gc.collect()
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        f()
+        return (best, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+def main(n=N):
+    for (name, grammar, lexer, syntax, mk_source) in [
+        ("stlc", stlc_grammar, stlc_lexer, stlc_syntax, stlc_source),
+        ("sysf", sysf_grammar, sysf_lexer, sysf_syntax, sysf_source),
+    ]:
+        g = grammar.mk_grammar()
+        fused = grammar.DbiParser()
+        toks = lexer.lex(mk_source(n))
+        two_pass = lambda: syntax.to_dbi(g.parse(iter(toks), tranx=True))
+        assert fused.parse(iter(toks)) == two_pass()
+        (t_two, m_two) = measure(two_pass)
+        (t_fused, m_fused) = measure(lambda: fused.parse(iter(toks)))
+        print(F"{name:5} {len(toks):7} tokens  parse+to_dbi {t_two * 1000:8.2f}ms {m_two / 1024:7.0f}K"
+              F"  fused {t_fused * 1000:8.2f}ms {m_fused / 1024:7.0f}K  x{t_two / t_fused:.2f}")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,37 @@
+"""
+Token-kind dispatch vs. scanning each state's actions with Matcher.match.
+
+    python -m benchmarks.bench_dispatch
+"""
+import sys
+
+from slang.stlc import grammar as stlc_grammar, lexer as stlc_lexer
+from slang.sysf import grammar as sysf_grammar, lexer as sysf_lexer
+from benchmarks.inputs import stlc_source, sysf_source
+from benchmarks._util import best_of
+
+class ScanOnly(object):
+    # hides the kind hooks so the grammar falls back to scanning
+    def __init__(self, matcher) -> None:
+        self.matcher = matcher
+
+    def match(self, s, t):
+        return self.matcher.match(s, t)
+
+def bench(name, mk_grammar, lex, src):
+    from slang.slr import grammar
+    g = mk_grammar()
+    g_scan = grammar(
+        [(r.symbol, r.pattern, r.action) for r in g.rules],
+        g.op_defs, ScanOnly(g.matcher))
+    toks = lex(src)
+    t_kind = best_of(lambda: g.parse(iter(toks)))
+    t_scan = best_of(lambda: g_scan.parse(iter(toks)))
+    print(F"{name:5} {len(toks):>8} tokens  scan {t_scan:8.3f}s  kind {t_kind:8.3f}s  x{t_scan / t_kind:.2f}")
+
+def main(n: int = 2000):
+    bench("stlc", stlc_grammar.mk_grammar, stlc_lexer.lex, stlc_source(n))
+    bench("sysf", sysf_grammar.mk_grammar, sysf_lexer.lex, sysf_source(n))
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,77 @@
+"""
+stlc evaluators on Church numeral products, k * k applications of the
+identity: substitution based evaluate against the closure compiling
+evaluate_compiled, which must be at least MIN_SPEEDUP times faster on the
+largest k, the CEK machine driven by step against its run loop, and the
+bytecode VM, compiled then run. Then the CEK run loop and the VM on
+BINDERS nested binders, whose cost per binder must not grow with the
+depth by more than MAX_GROWTH.
+
+    python -m benchmarks.bench_evaluate [k...]
+"""
+import gc
+import sys
+import time
+
+from slang.stlc.evaluate import CEK, EmptyEnv, StopEvalException, evaluate, evaluate_compiled
+from slang.stlc.grammar import DbiParser
+from slang.stlc.lexer import lex
+from slang.stlc.vm import compile_program, evaluate_vm, run
+from benchmarks.inputs import binders_source, church_source
+
+SIZES = [16, 32, 64, 128]
+MIN_SPEEDUP = 100
+BINDERS = [1000, 4000, 16000]
+MAX_GROWTH = 3.0
+
+def timed(f):
+    gc.collect()
+    t0 = time.perf_counter()
+    res = f()
+    return (time.perf_counter() - t0, res)
+
+def cek_stepped(t):
+    cek = CEK(t)
+    try:
+        while True:
+            cek.step()
+    except StopEvalException:
+        return cek
+
+def cek_run(t):
+    cek = CEK(t)
+    cek.run()
+    return cek
+
+def main(sizes=SIZES):
+    parser = DbiParser()
+    for k in sizes:
+        t = parser.parse(iter(lex(church_source(k))))
+        (t_subst, expected) = timed(lambda: evaluate(t, EmptyEnv()))
+        (t_compiled, res) = timed(lambda: evaluate_compiled(t))
+        assert res == expected
+        speedup = t_subst / t_compiled
+        (t_step, stepped) = timed(lambda: cek_stepped(t))
+        (t_run, ran) = timed(lambda: cek_run(t))
+        assert (ran.c, ran.steps) == (stepped.c, stepped.steps)
+        (t_compile, prog) = timed(lambda: compile_program(t))
+        (t_vm, _) = timed(lambda: run(prog))
+        assert evaluate_vm(t) == expected
+        print(F"k={k:<4} evaluate {t_subst * 1000:10.2f}ms  compiled {t_compiled * 1000:8.3f}ms  x{speedup:.0f}"
+              F"  cek step {t_step * 1000:8.2f}ms  run {t_run * 1000:8.2f}ms  {ran.steps} steps {ran.allocs} allocs"
+              F"  vm {t_compile * 1000:6.3f}+{t_vm * 1000:.3f}ms")
+    assert speedup >= MIN_SPEEDUP, F"compiled evaluation only x{speedup:.1f} faster"
+    per_binder = []
+    for d in BINDERS:
+        t = parser.parse(iter(lex(binders_source(d))))
+        (t_run, ran) = timed(lambda: cek_run(t))
+        prog = compile_program(t)
+        (t_vm, _) = timed(lambda: run(prog))
+        per_binder.append((t_run / d, t_vm / d))
+        print(F"d={d:<6} cek run {t_run * 1000:8.2f}ms  vm {t_vm * 1000:8.2f}ms")
+    for (i, name) in enumerate(["cek run", "vm"]):
+        growth = per_binder[-1][i] / per_binder[0][i]
+        assert growth < MAX_GROWTH, F"{name} cost per binder grows x{growth:.1f} with the depth"
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,29 @@
+"""
+GLR vs. deterministic parsing on conflict free input, per token cost.
+
+    python -m benchmarks.bench_glr
+"""
+import sys
+import time
+
+from slang import glr
+from slang.stlc.grammar import mk_grammar
+from benchmarks.bench_scaling import app_chain, arrow_chain
+
+def per_token(f, toks):
+    t0 = time.perf_counter()
+    f(iter(toks))
+    return (time.perf_counter() - t0) / len(toks)
+
+def main(sizes=(10_000, 100_000)):
+    g = mk_grammar()
+    g_glr = mk_grammar(glr=True)
+    for (name, mk_input) in [("app", app_chain), ("arrow", arrow_chain)]:
+        for n in sizes:
+            toks = mk_input(n)
+            t_lr = per_token(g.parse, toks)
+            t_glr = per_token(lambda ts: glr.parse(g_glr, ts), toks)
+            print(F"{name:6} {n:>8} tokens  lr {t_lr * 1e6:6.3f}us/token  glr {t_glr * 1e6:6.3f}us/token")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or (10_000, 100_000))
@@ -0,0 +1,56 @@
+"""
+Latency of a one character edit near the end, in the middle and at the
+start of growing sources, kept by IncrementalParse against lexing and
+parsing the edited source whole, building values (tranx) and trees. Edits
+near the end must not grow with the source. In tree mode the rest of the
+old parse is reused, copying only the nodes above the edit, so edits
+anywhere must beat parsing the source whole MIN_TREE_SPEEDUP times.
+
+    python -m benchmarks.bench_incremental [kilobytes...]
+"""
+import gc
+import sys
+import time
+
+from slang.incremental import IncrementalParse
+from slang.stlc import grammar as stlc_grammar, lexer as stlc_lexer
+from benchmarks.bench_lexer import sized
+from benchmarks.inputs import stlc_source
+
+SIZES = [16, 64, 256]
+MAX_RATIO = 4.0
+MIN_TREE_SPEEDUP = 5
+
+def timed(f, repeat=5):
+    gc.collect()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(sizes=SIZES):
+    g = stlc_grammar.mk_grammar()
+    for tranx in [True, False]:
+        end_costs = []
+        for kb in sizes:
+            src = sized(stlc_source, kb * 1024)
+            inc = IncrementalParse(g, stlc_lexer._STREAM_SCANNER, src, tranx=tranx)
+            t_full = timed(lambda: g.parse(iter(stlc_lexer.lex(inc.source)), tranx=tranx), 1)
+            cols = []
+            for (where, at) in [("end", src.rindex("x")), ("middle", src.index("x", len(src) // 2)), ("start", src.index("x"))]:
+                # renames a bound or free variable back and forth
+                dt = timed(lambda: (inc.edit(at, at + 1, "y"), inc.edit(at, at + 1, "x"))) / 2
+                cols.append(F"{where} {dt * 1000:8.2f}ms {inc.reparsed:7} tokens")
+                if where == "end":
+                    end_costs.append(dt)
+                if not tranx:
+                    assert t_full / dt >= MIN_TREE_SPEEDUP, F"tree edit at the {where} only x{t_full / dt:.1f} faster"
+            print(F"{'tranx' if tranx else 'tree':5} {len(src) / 1024:6.0f}K  {len(inc.stream):7} tokens"
+                  F"  full {t_full * 1000:8.2f}ms  " + "  ".join(cols))
+        ratio = end_costs[-1] / end_costs[0]
+        assert ratio < MAX_RATIO, F"edits at the end grow with the source, x{ratio:.2f}"
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
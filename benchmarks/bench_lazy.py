@@ -0,0 +1,58 @@
+"""
+Eager vs. lazy table construction on a grammar of many sub-languages when
+the input only uses one of them.
+
+    python -m benchmarks.bench_lazy
+"""
+import sys
+import time
+
+from slang.slr import NonTerminal, Terminal, EOF, LR1, SLR, grammar
+
+class NameMatcher(object):
+    def match(self, sym, tok):
+        return sym.s == tok
+
+    def token_kind(self, tok):
+        return tok
+
+    def terminal_kind(self, sym):
+        return sym.s
+
+def languages(n: int):
+    # S := kw_i E_i, E_i := E_i op_i T_i | T_i, T_i := val | ( E_i )
+    G = NonTerminal("G")
+    S = NonTerminal("S")
+    (lp, rp, val) = (Terminal("("), Terminal(")"), Terminal("val"))
+    rules = [(G, [S, EOF], lambda p: p[0])]
+    for i in range(n):
+        (e, t) = (NonTerminal(F"E{i}"), NonTerminal(F"T{i}"))
+        (kw, op) = (Terminal(F"kw{i}"), Terminal(F"op{i}"))
+        rules += [
+            (S, [kw, e], lambda p: p[1]),
+            (e, [e, op, t], lambda p: p),
+            (e, [t], lambda p: p[0]),
+            (t, [val], lambda p: p[0]),
+            (t, [lp, e, rp], lambda p: p[1]),
+        ]
+    return rules
+
+def main(n: int = 300):
+    rules = languages(n)
+    toks = ["kw0", "val", "op0", "(", "val", "op0", "val", ")"]
+    for mode in (SLR, LR1):
+        t0 = time.perf_counter()
+        g = grammar(rules, [], NameMatcher(), mode=mode)
+        t_eager = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        lazy = grammar(rules, [], NameMatcher(), mode=mode, lazy=True)
+        t_init = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        assert lazy.parse(iter(toks), tranx=True) == g.parse(iter(toks), tranx=True)
+        t_parse = time.perf_counter() - t0
+        print(F"{mode.mode:4} eager {len(g.states):6} states {t_eager * 1000:9.2f}ms  "
+              F"lazy init {t_init * 1000:7.2f}ms  first parse {t_parse * 1000:7.2f}ms  "
+              F"{len(lazy.table.rows)} rows built")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""
+Lexing throughput on multi-megabyte inputs, the cost per byte must stay
+flat as the input grows. The sequential scan that slices the rest of the
+input after each token is timed on a small input for reference, and the
+largest input is also streamed with iter_lex, and scanned into a
+TokenStream, comparing peak memory with the token list.
+
+    python -m benchmarks.bench_lexer [megabytes...]
+"""
+import gc
+import io
+import re
+import sys
+import time
+import tracemalloc
+
+from slang.stlc import lexer as stlc_lexer
+from slang.sysf import lexer as sysf_lexer
+from benchmarks.inputs import stlc_source, sysf_source
+
+SIZES = [1, 2, 4]
+MAX_RATIO = 2.0
+SMALL = 64 * 1024
+
+def sequential_lex(lex_def, s):
+    # the former slang.lexer.lex, quadratic in len(s)
+    tokens = []
+    r = None
+    while s != "":
+        for (pat, proc) in lex_def:
+            if r := pat.match(s):
+                proc(tokens, r)
+                break
+        if not r:
+            break
+        s = s[r.end():]
+    return tokens
+
+def sized(mk_source, n_bytes: int) -> str:
+    # a source of at least n_bytes, grown from a sample of its rate
+    sample = mk_source(100)
+    return mk_source(100 * n_bytes // len(sample) + 1)
+
+def timed(f):
+    gc.collect()
+    t0 = time.perf_counter()
+    res = f()
+    return (time.perf_counter() - t0, res)
+
+def peak(f) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main(sizes=SIZES):
+    for (name, module, mk_source) in [("stlc", stlc_lexer, stlc_source), ("sysf", sysf_lexer, sysf_source)]:
+        lex_def = [(re.compile(p), f) for (p, f) in module.LEX_DEF]
+        small = sized(mk_source, SMALL)
+        (t_seq, toks_seq) = timed(lambda: sequential_lex(lex_def, small))
+        (t_small, toks) = timed(lambda: module.lex(small))
+        assert toks == toks_seq
+        print(F"{name:5} {len(small) / 1024:8.0f}K  sequential {t_seq * 1000:8.2f}ms  scanner {t_small * 1000:8.2f}ms"
+              F"  x{t_seq / t_small:.1f}")
+        costs = []
+        for mb in sizes:
+            src = sized(mk_source, mb * 1024 * 1024)
+            (dt, toks) = timed(lambda: module.lex(src))
+            costs.append(dt / len(src))
+            print(F"{name:5} {len(src) / 2 ** 20:7.2f}MB  {len(toks):9} tokens  {dt * 1000:9.2f}ms"
+                  F"  {len(src) / dt / 2 ** 20:6.2f}MB/s")
+        (dt, n_toks) = timed(lambda: sum(1 for _ in module.iter_lex(io.StringIO(src))))
+        print(F"{name:5} {len(src) / 2 ** 20:7.2f}MB  {n_toks:9} tokens  {dt * 1000:9.2f}ms"
+              F"  {len(src) / dt / 2 ** 20:6.2f}MB/s  streamed")
+        (dt, stream) = timed(lambda: module.scan(src))
+        print(F"{name:5} {len(src) / 2 ** 20:7.2f}MB  {len(stream):9} tokens  {dt * 1000:9.2f}ms"
+              F"  {len(src) / dt / 2 ** 20:6.2f}MB/s  token stream")
+        del stream
+        (m_list, m_stream) = (peak(lambda: module.lex(src)), peak(lambda: module.scan(src)))
+        print(F"{name:5} peak memory  list {m_list / 2 ** 20:7.2f}MB  token stream {m_stream / 2 ** 20:7.2f}MB"
+              F"  x{m_list / m_stream:.1f}")
+        ratio = costs[-1] / costs[0]
+        assert ratio < MAX_RATIO, F"{name} lexing is not linear, per byte cost grew x{ratio:.2f}"
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,19 @@
+"""
+Table construction time and state count per construction mode.
+
+    python -m benchmarks.bench_modes
+"""
+from slang.slr import SLR, LALR, LR1
+from slang.stlc import grammar as stlc_grammar
+from slang.sysf import grammar as sysf_grammar
+from benchmarks._util import best_of
+
+def main():
+    for (name, mk_grammar) in [("stlc", stlc_grammar.mk_grammar), ("sysf", sysf_grammar.mk_grammar)]:
+        for mode in (SLR, LALR, LR1):
+            dt = best_of(lambda: mk_grammar(mode=mode), 5)
+            g = mk_grammar(mode=mode)
+            print(F"{name:5} {mode.mode:5} {len(g.states):4} states  {dt * 1000:8.2f}ms")
+
+if __name__ == "__main__":
+    main()
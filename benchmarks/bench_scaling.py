@@ -0,0 +1,43 @@
+"""
+Parse time per token must stay flat from 10k to 1M tokens.
+
+    python -m benchmarks.bench_scaling
+"""
+import gc
+import sys
+import time
+
+from slang.stlc.grammar import mk_grammar
+from slang.stlc.lexer import ARROW, COLON, DOT, LAM, UNIT, VAR
+
+SIZES = [10_000, 100_000, 1_000_000]
+MAX_RATIO = 2.0
+
+def app_chain(n: int):
+    # x x x ... , left recursive E1 := E1 E2, shallow stack
+    x = VAR("x")
+    return [x] * n
+
+def arrow_chain(n: int):
+    # \\x:0->0->...->0.x , right associative, the whole type sits on the stack
+    return [LAM, VAR("x"), COLON] + [UNIT, ARROW] * ((n - 6) // 2) + [UNIT, DOT, VAR("x")]
+
+def per_token(g, toks, tranx):
+    gc.collect()
+    t0 = time.perf_counter()
+    g.parse(iter(toks), tranx=tranx)
+    return (time.perf_counter() - t0) / len(toks)
+
+def main(sizes=SIZES):
+    g = mk_grammar()
+    for (name, mk_input) in [("app", app_chain), ("arrow", arrow_chain)]:
+        for tranx in (False, True):
+            costs = []
+            for n in sizes:
+                costs.append(per_token(g, mk_input(n), tranx))
+                print(F"{name:6} tranx={tranx!s:5} {n:>9} tokens  {costs[-1] * 1e6:6.3f}us/token")
+            ratio = costs[-1] / costs[0]
+            assert ratio < MAX_RATIO, F"{name} parse is not linear, per token cost grew x{ratio:.2f}"
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,73 @@
+"""
+Memory of the dict ParsingTable vs. the CompactTable arrays, and parse speed
+over each, on the bundled grammars and a synthetic precedence ladder.
+
+    python -m benchmarks.bench_table_memory
+"""
+import sys
+
+from slang.slr import NonTerminal, Terminal, EOF, grammar
+from slang.slr_impl import Rule, Symbol
+from slang.stlc import grammar as stlc_grammar, lexer as stlc_lexer
+from slang.sysf import grammar as sysf_grammar, lexer as sysf_lexer
+from benchmarks.inputs import stlc_source, sysf_source
+from benchmarks._util import best_of
+
+def deep_size(obj, seen=None) -> int:
+    # containers only, Symbols, Rules and token classes are shared
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (Symbol, Rule, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for (k, v) in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(v, seen) for v in obj)
+    return size
+
+class NameMatcher(object):
+    def match(self, sym, tok):
+        return sym.s == tok
+
+    def token_kind(self, tok):
+        return tok
+
+    def terminal_kind(self, sym):
+        return sym.s
+
+def ladder(levels: int):
+    # E0 := E0 op0 E1 | E1, ..., Ek := ( E0 ) | val
+    es = [NonTerminal(F"E{i}") for i in range(levels + 1)]
+    ops = [Terminal(F"op{i}") for i in range(levels)]
+    (lp, rp, val) = (Terminal("("), Terminal(")"), Terminal("val"))
+    rules = [(NonTerminal("G"), [es[0], EOF], lambda p: p[0])]
+    for i in range(levels):
+        rules.append((es[i], [es[i], ops[i], es[i + 1]], lambda p: p))
+        rules.append((es[i], [es[i + 1]], lambda p: p[0]))
+    rules.append((es[-1], [lp, es[0], rp], lambda p: p[1]))
+    rules.append((es[-1], [val], lambda p: p[0]))
+    g = grammar(rules, [], NameMatcher())
+    c = grammar(rules, [], NameMatcher(), compact=True)
+    toks = ["val"] + [t for i in range(2000) for t in (F"op{i % levels}", "val")]
+    return (g, c, toks)
+
+def report(name, g, c, toks):
+    dict_bytes = deep_size(g.table) + deep_size(g.dispatch) + deep_size(g.gotos)
+    compact_bytes = c.table.nbytes() + deep_size(c.terminal_of_kind)
+    t_dict = best_of(lambda: g.parse(iter(toks)))
+    t_compact = best_of(lambda: c.parse(iter(toks)))
+    print(F"{name:10} {len(g.table):5} states  dict {dict_bytes:9} B  compact {compact_bytes:7} B"
+          F"  x{dict_bytes / compact_bytes:5.1f}  parse dict {t_dict * 1000:7.2f}ms"
+          F"  compact {t_compact * 1000:7.2f}ms")
+
+def main(n: int = 2000):
+    report("stlc", stlc_grammar.mk_grammar(), stlc_grammar.mk_grammar(compact=True),
+           stlc_lexer.lex(stlc_source(n)))
+    report("sysf", sysf_grammar.mk_grammar(), sysf_grammar.mk_grammar(compact=True),
+           sysf_lexer.lex(sysf_source(n)))
+    for levels in (10, 50):
+        report(F"ladder{levels}", *ladder(levels))
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
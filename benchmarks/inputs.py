@@ -0,0 +1,32 @@
+# synthetic source programs for the bundled languages
+
+def stlc_source(n: int) -> str:
+    """
+    An application chain of n lambdas, roughly 10 tokens each.
+    """
+    return " ".join(["(\\x:0->0.x 0)"] * n)
+
+def sysf_source(n: int) -> str:
+    """
+    n nested polymorphic identities applied to unit, roughly 25 tokens each.
+    """
+    return "(/id:@T.T->T.id[0]0)(@T./x:T.x)" + " (@T./x:T.x)[0]0" * n
+
+def church_source(k: int) -> str:
+    """
+    stlc k * k by Church numerals, applied to the identity on unit.
+    """
+    n = "(0->0)->0->0"
+    c = "(/f:0->0.(/x:0." + "f (" * k + "x" + ")" * k + "))"
+    mult = F"(/m:{n}.(/n:{n}.(/f:0->0.m (n f))))"
+    return F"{mult} {c} {c} (/x:0.x) 0".replace("/", "\\")
+
+def binders_source(d: int) -> str:
+    """
+    stlc d nested unit binders applied to d units, the innermost body is
+    the outermost variable, so environments grow d deep.
+    """
+    # variable names are letters only, the digits of i spelled a to j
+    name = lambda i: "x" + str(i).translate(str.maketrans("0123456789", "abcdefghij"))
+    lams = "".join(F"(\\{name(i)}:0." for i in range(d))
+    return lams + name(0) + ")" * d + " 0" * d
@@ -0,0 +1,164 @@
+from collections import deque
+from itertools import product
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from slang.slr_impl import Grammar, Node, ParseError, Rule, Symbol, Token, has_kinds
+
+class ForestNode(object):
+    """
+    Shared packed parse forest node, symbol derives tokens [start, end),
+    one packed alternative per distinct derivation.
+    """
+    __slots__ = ("symbol", "start", "end", "alternatives", "_seen")
+
+    def __init__(self, symbol: Symbol, start: int, end: int) -> None:
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self.alternatives: List[Tuple[Rule, Tuple[Any, ...]]] = []
+        self._seen = set()
+
+    def add(self, rule: Rule, children: Tuple[Any, ...]) -> None:
+        key = (rule.rid, tuple(id(c) for c in children))
+        if key not in self._seen:
+            self._seen.add(key)
+            self.alternatives.append((rule, children))
+
+    def is_ambiguous(self) -> bool:
+        return len(self.alternatives) > 1
+
+    def __str__(self) -> str:
+        return F"{self.symbol}[{self.start}:{self.end}]"
+
+    __repr__ = __str__
+
+class _StackNode(object):
+    # graph structured stack node, edges map the node below to the value between
+    __slots__ = ("state", "level", "edges")
+
+    def __init__(self, state: int, level: int) -> None:
+        self.state = state
+        self.level = level
+        self.edges: Dict["_StackNode", Any] = {}
+
+def _paths(node: _StackNode, size: int, via: Optional[_StackNode]):
+    """
+    All (bottom node, values) reachable by popping size edges,
+    the first edge is restricted to via when given.
+    """
+    if size == 0:
+        return [(node, ())]
+    edges = [(via, node.edges[via])] if via is not None else node.edges.items()
+    paths = [(u, (v,)) for (u, v) in edges]
+    for _ in range(size - 1):
+        paths = [(u2, (v2,) + vs) for (u, vs) in paths for (u2, v2) in u.edges.items()]
+    return paths
+
+def parse(grammar: Grammar[Token], toks: Iterator[Token]) -> ForestNode:
+    """
+    Tomita style GLR over a grammar built with glr=True, returns the forest
+    of the first symbol of the start rule, like Grammar.parse does.
+    """
+    if not grammar.glr:
+        raise Exception("grammar is not built with glr=True")
+    dispatch = grammar.glr_dispatch
+    gotos = grammar.gotos
+    init_rule = grammar.rules[0]
+    kind = grammar.matcher.token_kind if has_kinds(grammar.matcher) else (lambda tok: tok)
+    has_epsilon = any(not r.pattern for r in grammar.rules)
+    no_actions = ()
+
+    frontier = {0: _StackNode(0, 0)}
+    level = 0
+    toks = iter(toks)
+    while True:
+        tok = next(toks, None)
+        key = None if tok is None else kind(tok)
+        forest: Dict[Tuple[Symbol, int], ForestNode] = {}
+        work: Deque[Tuple[_StackNode, Rule, Optional[_StackNode]]] = deque()
+
+        def _queue(node: _StackNode, via: Optional[_StackNode] = None) -> None:
+            for act in dispatch[node.state].get(key, no_actions):
+                if act.__class__ is not int and (via is None or act.pattern):
+                    work.append((node, act, via))
+
+        for node in frontier.values():
+            _queue(node)
+        # reduce until no new stack node or edge appears
+        while work:
+            (node, rule, via) = work.popleft()
+            for (u, children) in _paths(node, len(rule.pattern), via):
+                fkey = (rule.symbol, u.level)
+                if (fnode := forest.get(fkey)) is None:
+                    fnode = forest[fkey] = ForestNode(rule.symbol, u.level, level)
+                fnode.add(rule, children)
+                dst = gotos[u.state][rule.symbol]
+                if (w := frontier.get(dst)) is None:
+                    w = frontier[dst] = _StackNode(dst, level)
+                    w.edges[u] = fnode
+                    _queue(w)
+                elif u not in w.edges:
+                    w.edges[u] = fnode
+                    if has_epsilon:
+                        # paths through the new edge may start above w
+                        for n in list(frontier.values()):
+                            _queue(n)
+                    else:
+                        _queue(w, u)
+        # shift
+        next_frontier: Dict[int, _StackNode] = {}
+        accepted = []
+        for node in frontier.values():
+            for act in dispatch[node.state].get(key, no_actions):
+                if act.__class__ is int:
+                    if act == -1:
+                        accepted.append(node)
+                    else:
+                        if (w := next_frontier.get(act)) is None:
+                            w = next_frontier[act] = _StackNode(act, level + 1)
+                        w.edges[node] = tok
+        if accepted:
+            results = {}
+            for node in accepted:
+                for (_, children) in _paths(node, len(init_rule.pattern) - 1, None):
+                    results[id(children[0])] = children
+            if len(results) == 1:
+                return next(iter(results.values()))[0]
+            root = ForestNode(init_rule.symbol, 0, level + 1)
+            for children in results.values():
+                root.add(init_rule, children + (None,))
+            return root
+        if not next_frontier:
+            expected = {sym for node in frontier.values() for sym in grammar.table[node.state][0]}
+            raise ParseError(level, tok, sorted(expected))
+        frontier = next_frontier
+        level += 1
+
+def forest_trees(node: Any) -> Iterator[Any]:
+    """
+    Every Node tree packed in the forest, the count can be exponential.
+    """
+    if not isinstance(node, ForestNode):
+        yield node
+        return
+    for (rule, children) in node.alternatives:
+        for combo in product(*[list(forest_trees(c)) for c in children]):
+            yield Node(rule, list(combo))
+
+def count_trees(node: Any) -> int:
+    counts: Dict[int, int] = {}
+
+    def _go(node: Any) -> int:
+        if not isinstance(node, ForestNode):
+            return 1
+        if (n := counts.get(id(node))) is None:
+            n = 0
+            for (_, children) in node.alternatives:
+                m = 1
+                for c in children:
+                    m *= _go(c)
+                n += m
+            counts[id(node)] = n
+        return n
+
+    return _go(node)
@@ -0,0 +1,212 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from typing import Any, Dict, Generic, List, Optional, Set, Tuple
+
+from slang.lexer import StreamScanner, TokenStream
+from slang.slr_impl import Grammar, Node, ParseError, Parser, Token
+
+# tokens fed, states, stack, _resync, _resumed, errors so far, lowest stack
+# length since the previous snapshot
+_Snapshot = Tuple[int, List[int], List[Any], int, Tuple[int, int], int, int]
+
+class _Stack(list):
+    # a parser value stack noting the lowest length it was cut down to
+    __slots__ = ("low",)
+
+    def __delitem__(self, i: Any) -> None:
+        list.__delitem__(self, i)
+        if len(self) < self.low:
+            self.low = len(self)
+
+class IncrementalParse(Generic[Token]):
+    """
+    A source kept lexed and parsed across edits. The token stream keeps the
+    spans to relex only around an edit, see StreamScanner.rescan, and the
+    parser stacks are saved every interval tokens. An edit resumes the parser
+    from the last snapshot before its first changed token. Past the relexed
+    region, once the parser states match those of an old snapshot at the
+    same (shifted) token, the rest of the old parse is reused: as is if the
+    values on the stacks are the same, and in tree mode (tranx=False) by
+    copying the old trees from the new values up, sharing the rest, so the
+    results returned before don't change. Semantic values are built bottom
+    up, so in tranx mode the tokens to the end are usually parsed again.
+
+    Results and errors are those of grammar.parse on the whole source, a
+    syntax error raised by edit leaves the parse ready for the next edit.
+    Old parses are only reused without an error list.
+    """
+    def __init__(
+        self,
+        grammar: Grammar[Token],
+        scanner: StreamScanner[Token],
+        source: str,
+        tranx: bool = False,
+        errors: Optional[List[ParseError]] = None,
+        interval: int = 32,
+        lookahead: int = 1,
+    ) -> None:
+        """
+        :param errors: as for grammar.parse, kept to the errors of the current source
+        :param lookahead: characters the patterns look past a token, see rescan
+        """
+        self.grammar = grammar
+        self.scanner = scanner
+        self.tranx = tranx
+        self.errors = errors
+        self.interval = interval
+        self.lookahead = lookahead
+        self.stream: TokenStream[Token] = scanner.scan(source)
+        self.snapshots: List[_Snapshot] = []
+        self._positions: List[int] = []  # tokens fed of each snapshot, to bisect
+        # lowest stack length since the last snapshot and the stack after finish
+        self._tail: Optional[Tuple[int, List[Any]]] = None
+        self.reparsed = 0  # tokens fed by the last parse
+        self.result: Any = self._parse(0)
+
+    @property
+    def source(self) -> str:
+        return self.stream.source
+
+    def edit(self, start: int, end: int, text: str) -> Any:
+        """
+        Replace source[start:end] with text, returns the new result.
+        """
+        n = len(self.stream)
+        (k, j) = self.scanner.rescan(self.stream, start, end, text, self.lookahead)
+        self.result = self._parse(k, j, len(self.stream) - n)
+        return self.result
+
+    def _parse(self, k: int, j: int = -1, shift: int = 0) -> Any:
+        # parse from the last snapshot with at most k tokens fed, the old
+        # tokens from j on are kept, shifted by shift
+        (snapshots, positions) = (self.snapshots, self._positions)
+        i = bisect_right(positions, k)
+        (tail, self._tail) = (self._tail, None)
+        if j < 0 or tail is None or self.errors is not None:
+            o = len(snapshots)
+        else:
+            o = bisect_left(positions, j, i)
+        parser = Parser(self.grammar, self.tranx, self.errors)
+        if i:
+            (n, states, stack, parser._resync, parser._resumed, n_errors, _) = snapshots[i - 1]
+            (parser.pos, parser.states, parser.stack) = (n, list(states), _Stack(stack))
+        else:
+            (n, n_errors) = (0, 0)
+            parser.stack = _Stack()
+        parser.stack.low = len(parser.stack)
+        if self.errors is not None:
+            del self.errors[n_errors:]
+        (feed, interval) = (parser.feed, self.interval)
+        # snapshots of this parse, None once they are in place
+        fresh: Optional[List[_Snapshot]] = []
+        try:
+            for tok in self.stream.tokens(n):
+                feed(tok)
+                pos = parser.pos
+                while o < len(snapshots) and snapshots[o][0] + shift < pos:
+                    o += 1
+                if o < len(snapshots) and snapshots[o][0] + shift == pos and snapshots[o][1] == parser.states:
+                    if self._reuse(parser, o, tail):
+                        fresh.append(self._snapshot(parser))
+                        if shift:
+                            snapshots[o + 1:] = [(snap[0] + shift,) + snap[1:] for snap in snapshots[o + 1:]]
+                            positions[o + 1:] = [p + shift for p in positions[o + 1:]]
+                        snapshots[i:o + 1] = fresh
+                        positions[i:o + 1] = [snap[0] for snap in fresh]
+                        fresh = None
+                        self.reparsed = pos - n
+                        return self._tail[1][0]
+                if pos % interval == 0:
+                    fresh.append(self._snapshot(parser))
+            self.reparsed = parser.pos - n
+            result = parser.finish()
+            self._tail = (parser.stack.low, list(parser.stack))
+            return result
+        finally:
+            if fresh is not None:
+                snapshots[i:] = fresh
+                positions[i:] = [snap[0] for snap in fresh]
+
+    def _snapshot(self, parser: Parser[Token]) -> _Snapshot:
+        stack = parser.stack
+        snap = (
+            parser.pos, list(parser.states), list(stack), parser._resync, parser._resumed,
+            0 if self.errors is None else len(self.errors), stack.low,
+        )
+        stack.low = len(stack)
+        return snap
+
+    def _reuse(self, parser: Parser[Token], o: int, tail: Tuple[int, List[Any]]) -> bool:
+        """
+        Take over the rest of the old parse from snapshots[o], which parser
+        agrees with on states. Where parser's stack differs, the old trees
+        are copied from the changed values up, the trees returned before
+        are left as they were, and the snapshots after it and tail get the
+        copies.
+        """
+        snapshots = self.snapshots
+        prev = snapshots[o][2]
+        pending = {i: v for (i, (u, v)) in enumerate(zip(prev, parser.stack)) if u is not v}
+        if pending and self.tranx:
+            return False
+        # the old stacks after prev, with their lowest length since the previous
+        later = ((snap[6], snap[2]) for snap in islice(snapshots, o + 1, None))
+        for (low, stack) in chain(later, [tail]):
+            if not pending:
+                break
+            kept = list(stack)
+            popped = {i - low: v for (i, v) in pending.items() if i >= low}
+            pending = {i: v for (i, v) in pending.items() if i < low}
+            for (i, v) in pending.items():
+                stack[i] = v
+            if popped:
+                nodes = {id(v) for v in prev[low:] if v.__class__ is Node}
+                for (i, v) in enumerate(_rebuild(stack[low:], nodes, len(prev) - low, popped), low):
+                    if v is not stack[i]:
+                        stack[i] = pending[i] = v
+            prev = kept
+        self._tail = tail
+        return True
+
+def _rebuild(roots: List[Any], nodes: Set[int], count: int, new: Dict[int, Any]) -> List[Any]:
+    """
+    roots with the n-th of their first count leaves, in order, replaced by
+    new[n]. Nodes with their id in nodes are leaves. The Nodes above a
+    replaced leaf are copied, the others are shared.
+    """
+    (res, seen, left) = ([], 0, len(new))
+    for root in roots:
+        if not left or root.__class__ is not Node:
+            res.append(root)
+            continue
+        # [node, index of the next child, its new children so far or None]
+        work = [[root, 0, None]]
+        while True:
+            frame = work[-1]
+            (node, i, copy) = frame
+            children = node.children
+            if i < len(children) and left:
+                c = children[i]
+                if c.__class__ is Node and id(c) not in nodes:
+                    work.append([c, 0, None])
+                    continue
+                v = new.get(seen, c) if seen < count else c
+                if v is not c:
+                    left -= 1
+                seen += 1
+            else:
+                work.pop()
+                v = node if copy is None else Node(node.rule, copy + children[i:])
+                if not work:
+                    res.append(v)
+                    break
+                frame = work[-1]
+                (node, i, copy) = frame
+                c = node.children[i]
+            # v stands for child i of frame
+            if copy is None and v is not c:
+                copy = frame[2] = node.children[:i]
+            if copy is not None:
+                copy.append(v)
+            frame[1] = i + 1
+    return res
@@ -1,19 +1,280 @@
+import codecs
+import mmap
 import re
 
-from typing import List, Tuple, TypeVar, Callable
+from array import array
+from bisect import bisect_left
+
+from typing import Any, Dict, Generic, Hashable, Iterator, List, Mapping, Tuple, TypeVar, Callable, Union
 
 TToken = TypeVar("Token")
-LexDef = List[Tuple[re.Pattern, Callable[[List[TToken], re.Match], None]]]
+LexDef = List[Tuple[Union[re.Pattern, str], Callable[[List[TToken], re.Match], None]]]
+
+def _source(pat: Union[re.Pattern, str]) -> str:
+    # compiled flags become scoped inline ones, re.L can't be scoped
+    if isinstance(pat, str):
+        return pat
+    if pat.flags & re.L:
+        raise ValueError(F"re.LOCALE can't be scoped to a pattern: {pat.pattern!r}")
+    flags = "".join(c for (c, f) in [("a", re.A), ("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X)] if pat.flags & f)
+    return F"(?{flags}:{pat.pattern})" if flags else pat.pattern
+
+def _alternation(pats: List[Union[re.Pattern, str]]) -> Tuple[re.Pattern, List[int]]:
+    # one alternation of pats, and by group index the pattern a match ended in, or -1
+    pattern = re.compile("|".join(F"(?P<_{i}>{_source(pat)})" for (i, pat) in enumerate(pats)))
+    index = [-1] * (pattern.groups + 1)
+    for i in range(len(pats)):
+        index[pattern.groupindex[F"_{i}"]] = i
+    return (pattern, index)
+
+class Scanner(Generic[TToken]):
+    """
+    A LexDef compiled into one alternation with a named group per pattern,
+    matched at a cursor with pattern.match(s, pos). As with trying the
+    patterns in turn, the first one that matches wins, and scanning stops
+    at input none matches.
+
+    procs get the match of the whole alternation, so group() is the token
+    text, groups numbered within a pattern are shifted.
+    """
+    def __init__(self, lex_def: LexDef) -> None:
+        (self.pattern, index) = _alternation([pat for (pat, _) in lex_def])
+        # by index of the group around each pattern, what lastindex is on a match
+        self.procs: List[Callable[[List[TToken], re.Match], None]] = [
+            lex_def[i][1] if i >= 0 else None for i in index
+        ]
+
+    def lex(self, s: str) -> List[TToken]:
+        tokens: List[TToken] = []
+        (match, procs) = (self.pattern.match, self.procs)
+        pos = 0
+        end = len(s)
+        while pos < end:
+            r = match(s, pos)
+            if r is None or r.end() == pos:
+                break
+            procs[r.lastindex](tokens, r)
+            pos = r.end()
+        return tokens
+
+    def iter_lex(self, source: Any, chunk_size: int = 1 << 16, lookahead: int = 64) -> Iterator[TToken]:
+        """
+        The tokens lex gives for all of source, read chunk_size characters
+        at a time and yielded as they are scanned. source is a str, a text
+        or binary file object, or a buffer like mmap, bytes are decoded as
+        UTF-8. A match is trusted once lookahead more characters are read
+        or the input ended, a token straddling chunks is rescanned whole, so
+        the patterns must decide within lookahead characters past a token.
+        """
+        chunks = _chunks(source, chunk_size)
+        (match, procs) = (self.pattern.match, self.procs)
+        out: List[TToken] = []
+        buf = ""
+        pos = 0
+        eof = False
+        while True:
+            if not eof and len(buf) - pos <= lookahead:
+                if (chunk := next(chunks, None)) is None:
+                    eof = True
+                else:
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                continue
+            if pos >= len(buf):
+                return
+            r = match(buf, pos)
+            if r is None or r.end() == pos:
+                return
+            if not eof and len(buf) - r.end() <= lookahead:
+                # may go on in the next chunk
+                if (chunk := next(chunks, None)) is None:
+                    eof = True
+                else:
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                continue
+            procs[r.lastindex](out, r)
+            pos = r.end()
+            if out:
+                yield from out
+                out.clear()
+
+def _chunks(source: Any, size: int) -> Iterator[str]:
+    # non empty pieces of source as str
+    if isinstance(source, str):
+        for i in range(0, len(source), size):
+            yield source[i:i + size]
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        pieces = (source[i:i + size] for i in range(0, len(source), size))
+    else:
+        pieces = _reads(source, size)
+    for data in pieces:
+        if text := data if isinstance(data, str) else decoder.decode(data):
+            yield text
+    if text := decoder.decode(b"", final=True):
+        yield text
+
+def _reads(f: Any, size: int) -> Iterator[Any]:
+    while data := f.read(size):
+        yield data
 
 def lex(lex_def: LexDef, s: str) -> List[TToken]:
-    tokens : List[Token] = []
-    r = None
-    while s != "":
-        for (pat, proc) in lex_def:
-            if r := pat.match(s):
-                proc(tokens, r)
+    return Scanner(lex_def).lex(s)
+
+def iter_lex(lex_def: LexDef, source: Any, chunk_size: int = 1 << 16) -> Iterator[TToken]:
+    return Scanner(lex_def).iter_lex(source, chunk_size)
+
+# a pattern with the token it produces: the flyweight token of every match,
+# a type making the token of a match's text, or None to skip the match
+StreamDef = List[Tuple[Union[re.Pattern, str], Any]]
+
+class TokenStream(Generic[TToken]):
+    """
+    Tokens of source as parallel arrays: kinds[i] is the index in the
+    StreamDef of the i-th token's pattern, source[starts[i]:ends[i]] its text
+    and values[i] the index of its token in value_tokens, -1 for a flyweight.
+    Iterating yields the tokens lex would, with equal ones shared.
+    """
+    def __init__(self, source: str, produces: List[Any]) -> None:
+        self.source = source
+        self.produces = produces
+        self.kinds = array("H")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.values = array("i")
+        # one made token per distinct (kind, text), by kind text to its index
+        self.value_tokens: List[TToken] = []
+        self._interned: List[Dict[str, int]] = [{} for _ in produces]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, i: int) -> TToken:
+        v = self.values[i]
+        return self.produces[self.kinds[i]] if v < 0 else self.value_tokens[v]
+
+    def __iter__(self) -> Iterator[TToken]:
+        return self.tokens()
+
+    def tokens(self, start: int = 0) -> Iterator[TToken]:
+        (produces, value_tokens) = (self.produces, self.value_tokens)
+        for (k, v) in zip(self.kinds[start:], self.values[start:]):
+            yield produces[k] if v < 0 else value_tokens[v]
+
+    def text(self, i: int) -> str:
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in [self.kinds, self.starts, self.ends, self.values])
+
+class StreamScanner(Generic[TToken]):
+    """
+    Scanner into TokenStreams, with the matching rules of Scanner. Tokens
+    are only made for patterns producing a type, once per distinct text in
+    a stream.
+    """
+    def __init__(self, stream_def: StreamDef) -> None:
+        (self.pattern, index) = _alternation([pat for (pat, _) in stream_def])
+        self.produces = [p for (_, p) in stream_def]
+        if len(self.produces) > 1 << 16:
+            raise Exception("too many token kinds")
+        # by group index the kind of a match, -1 to skip it
+        self._kind_of_group = [-1 if i < 0 or self.produces[i] is None else i for i in index]
+        self._makes = [isinstance(p, type) for p in self.produces]
+
+    def scan(self, s: str) -> TokenStream[TToken]:
+        stream = TokenStream(s, self.produces)
+        self._scan(stream, s, 0)
+        return stream
+
+    def rescan(
+        self, stream: TokenStream[TToken], start: int, end: int, text: str, lookahead: int = 1,
+    ) -> Tuple[int, int]:
+        """
+        Update stream in place to its source with [start, end) replaced by
+        text. Tokens ending lookahead characters before the edit are kept,
+        scanning resumes after them and stops at the first position past the
+        edit a token of stream started at, the tokens from there on are kept,
+        shifted. Returns the index of the first token that may differ, and
+        the index the first kept token after it had before the edit.
+        """
+        source = stream.source[:start] + text + stream.source[end:]
+        delta = len(text) - (end - start)
+        k = bisect_left(stream.ends, start - lookahead + 1)
+        part = TokenStream(source, self.produces)
+        (part.value_tokens, part._interned) = (stream.value_tokens, stream._interned)
+        j = self._scan(part, source, stream.ends[k - 1] if k else 0, start + len(text), stream.starts, delta)
+        if j < 0:
+            j = len(stream)
+        if delta:
+            stream.starts[j:] = array("I", map(delta.__add__, stream.starts[j:]))
+            stream.ends[j:] = array("I", map(delta.__add__, stream.ends[j:]))
+        stream.kinds[k:j] = part.kinds
+        stream.starts[k:j] = part.starts
+        stream.ends[k:j] = part.ends
+        stream.values[k:j] = part.values
+        stream.source = source
+        return (k, j)
+
+    def _scan(
+        self, stream: TokenStream[TToken], s: str, pos: int,
+        sync_from: int = -1, sync_starts: array = array("I"), delta: int = 0,
+    ) -> int:
+        # appends the tokens from pos, till a cursor at or past sync_from
+        # (if not -1) is at a start in sync_starts shifted by delta, its index
+        # there is returned, -1 when scanned to the end
+        (kinds, starts, ends, values) = (stream.kinds, stream.starts, stream.ends, stream.values)
+        (value_tokens, interned) = (stream.value_tokens, stream._interned)
+        (match, kind_of_group, makes, produces) = (self.pattern.match, self._kind_of_group, self._makes, self.produces)
+        if sync_from < 0:
+            sync_from = len(s) + 1
+        j = 0
+        end = len(s)
+        while pos < end:
+            if pos >= sync_from:
+                j = bisect_left(sync_starts, pos - delta, j)
+                if j < len(sync_starts) and sync_starts[j] == pos - delta:
+                    return j
+            r = match(s, pos)
+            if r is None or r.end() == pos:
                 break
-        if not r:
-            break
-        s = s[r.end():]
-    return tokens
+            e = r.end()
+            k = kind_of_group[r.lastindex]
+            if k >= 0:
+                kinds.append(k)
+                starts.append(pos)
+                ends.append(e)
+                if makes[k]:
+                    text = s[pos:e]
+                    if (v := interned[k].get(text)) is None:
+                        v = interned[k][text] = len(value_tokens)
+                        value_tokens.append(produces[k](text))
+                    values.append(v)
+                else:
+                    values.append(-1)
+            pos = e
+        return -1
+
+class StreamMatcher(object):
+    """
+    KindMatcher on the kinds of a StreamDef, terminals maps each terminal to
+    the index of its pattern. Flyweights are told apart by identity and made
+    tokens by type, so tokens should come from the scanner's streams.
+    """
+    def __init__(self, scanner: StreamScanner, terminals: Mapping[Any, int]) -> None:
+        self.terminals = terminals
+        # flyweights are kept alive by the scanner, their ids stay theirs
+        self._by_id = {id(p): k for (k, p) in enumerate(scanner.produces) if p is not None and not isinstance(p, type)}
+        self._by_type = {p: k for (k, p) in enumerate(scanner.produces) if isinstance(p, type)}
+
+    def match(self, sym: Any, tok: Any) -> bool:
+        return self.terminals.get(sym) == self.token_kind(tok)
+
+    def token_kind(self, tok: Any) -> Hashable:
+        k = self._by_id.get(id(tok))
+        return self._by_type.get(type(tok)) if k is None else k
+
+    def terminal_kind(self, sym: Any) -> Hashable:
+        return self.terminals[sym]
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Dict, Set
 from slang.slr import Terminal, Symbol
 
 @dataclass
@@ -11,5 +12,25 @@ class TerminalOfToken(Terminal):
         self.token = token
 
 class Matcher(object):
+    """
+    Terminals match tokens of their class or a subclass. The kind of a
+    token is the nearest class in its MRO that a terminal was keyed by.
+    """
+    def __init__(self) -> None:
+        self.kinds: Set[type] = set()
+        self._kind_of: Dict[type, type] = {}
+
     def match(self, s: Symbol, t: Token):
         return isinstance(s, TerminalOfToken) and isinstance(t, s.token)
+
+    def token_kind(self, t: Token):
+        cls = t.__class__
+        if (kind := self._kind_of.get(cls)) is None:
+            kind = self._kind_of[cls] = next((c for c in cls.__mro__ if c in self.kinds), cls)
+        return kind
+
+    def terminal_kind(self, s: TerminalOfToken):
+        if s.token not in self.kinds:
+            self.kinds.add(s.token)
+            self._kind_of.clear()
+        return s.token
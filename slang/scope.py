@@ -0,0 +1,28 @@
+from typing import Dict, List
+
+class Scope(object):
+    """
+    Names bound around the current position of a parse, each name to the
+    depths of its binders, innermost last. Parser actions bind at a binder
+    head and unbind once its body is reduced, so a variable is resolved to
+    its de Bruijn index when it is reduced, without a pass over the tree.
+    """
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.depths: Dict[str, List[int]] = {}
+        self.depth = 0
+
+    def bind(self, name: str) -> None:
+        self.depths.setdefault(name, []).append(self.depth)
+        self.depth += 1
+
+    def unbind(self, name: str) -> None:
+        self.depths[name].pop()
+        self.depth -= 1
+
+    def index(self, name: str) -> int:
+        # -1 if unbound
+        depths = self.depths.get(name)
+        return self.depth - 1 - depths[-1] if depths else -1
@@ -2,6 +2,7 @@ from .slr_impl import *
 
 __all__ = [
     "Symbol", "Terminal", "NonTerminal", "EOF",
-    "Grammar", "Token", "Matcher",
+    "Grammar", "Parser", "ParseError", "Node", "Token", "Matcher",
     "Association", "LeftAssoc", "RightAssoc",
+    "Construction", "SLR", "LALR", "LR1",
 ]
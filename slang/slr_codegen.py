@@ -0,0 +1,161 @@
+from types import ModuleType
+from typing import Any, Callable, Iterable, List, Optional
+
+from slang.slr_impl import (
+    EOF, Grammar, Matcher, Node, NonTerminal, ParseError, Rule, Terminal, Token, has_kinds,
+)
+
+_DRIVER = '''
+class ParseError(Exception):
+    """
+    Syntax error at the pos-th token (EOF is the one after the last),
+    expected are the names of the terminals the parser could act on there.
+    """
+    def __init__(self, pos, token, expected):
+        self.pos = pos
+        self.token = token
+        self.expected = expected
+        tok = "eof" if token is None else repr(token)
+        super().__init__(F"parse error at token {pos}: {tok}, expected {', '.join(map(str, expected)) or 'nothing'}")
+
+def parse(toks, kind, terminal_of_kind, rules, tranx=True, node=None, error=ParseError):
+    """
+    :param kind: token -> token kind
+    :param terminal_of_kind: token kind -> terminal id
+    :param rules: Rule objects in RULES order, their actions run when tranx
+    :param node: (rule, children) -> parse tree node, pairs by default
+    :param error: (pos, token, expected terminal names) -> the exception raised
+    """
+    if node is None:
+        node = lambda rule, vals: (rule, vals)
+    action_tab = ACTION
+    goto_tab = GOTO
+    sizes = RULE_SIZE
+    lhs = RULE_LHS
+    n_ts = len(TERMINALS)
+    n_nts = len(NONTERMINALS)
+    actions = [r.action for r in rules]
+    stack = []
+    states = [0]
+    state = 0
+    for (pos, tok) in enumerate(_chain(toks, _EOF)):
+        t = 0 if tok is None else terminal_of_kind.get(kind(tok), -1)
+        a = 0 if t < 0 else action_tab[state * n_ts + t]
+        while True:
+            if a > 0:
+                # shift
+                stack.append(tok)
+                state = a - 1
+                states.append(state)
+                break
+            if a == 0:
+                row = action_tab[state * n_ts:(state + 1) * n_ts]
+                raise error(pos, tok, [name for (name, code) in zip(TERMINALS, row) if code])
+            if a == -1:
+                return stack[0]
+            # reduce
+            r = -2 - a
+            size = sizes[r]
+            if size:
+                vals = stack[-size:]
+                del stack[-size:]
+                del states[-size:]
+            else:
+                vals = []
+            stack.append(actions[r](vals) if tranx else node(rules[r], vals))
+            state = goto_tab[states[-1] * n_nts + lhs[r]]
+            states.append(state)
+            a = action_tab[state * n_ts + t]
+'''
+
+def _tuple_src(name: str, vals: Iterable[Any], per_line: int = 24) -> str:
+    vals = [repr(v) for v in vals]
+    lines = [
+        "    " + ", ".join(vals[i:i + per_line]) + ","
+        for i in range(0, len(vals), per_line)
+    ]
+    return "\n".join([F"{name} = ("] + lines + [")"])
+
+def generate(grammar: Grammar[Token]) -> str:
+    """
+    Source of a standalone parser module, tables are flat tuples indexed by
+    state * width + symbol id, semantic actions are looked up by rule index.
+
+    ACTION entries: 0 error, -1 accept, s + 1 shift to s, -2 - r reduce rules[r].
+    """
+    if grammar.lazy:
+        grammar.table.complete()
+    terminals = [EOF] + sorted(sym for sym in grammar.symbols if isinstance(sym, Terminal) and sym != EOF)
+    nonterminals = sorted(sym for sym in grammar.symbols if isinstance(sym, NonTerminal))
+    t_ids = {sym: i for (i, sym) in enumerate(terminals)}
+    nt_ids = {sym: i for (i, sym) in enumerate(nonterminals)}
+    r_ids = {r.rid: i for (i, r) in enumerate(grammar.rules)}
+    n_states = len(grammar.table)
+
+    action = [0] * (n_states * len(terminals))
+    goto = [0] * (n_states * len(nonterminals))
+    for i in range(n_states):
+        (actions, gotos) = grammar.table[i]
+        if grammar.compact and (default := grammar.table.default(i)):
+            actions = {sym: actions.get(sym, default) for sym in grammar.table.expected(i)}
+        for (sym, act) in actions.items():
+            if isinstance(act, Rule):
+                code = -2 - r_ids[act.rid]
+            elif act == -1:
+                code = -1
+            else:
+                code = act + 1
+            action[i * len(terminals) + t_ids[sym]] = code
+        for (sym, dst) in gotos.items():
+            goto[i * len(nonterminals) + nt_ids[sym]] = dst
+
+    parts = [
+        F"# generated by slang.slr_codegen, grammar {grammar.fingerprint}",
+        "# flake8: noqa",
+        "from itertools import chain as _chain",
+        "",
+        F"FINGERPRINT = {grammar.fingerprint!r}",
+        _tuple_src("RULES", [str(r) for r in grammar.rules], 1),
+        _tuple_src("TERMINALS", [sym.s for sym in terminals], 8),
+        _tuple_src("NONTERMINALS", [sym.s for sym in nonterminals], 8),
+        _tuple_src("RULE_SIZE", [len(r.pattern) for r in grammar.rules]),
+        _tuple_src("RULE_LHS", [nt_ids[r.symbol] for r in grammar.rules]),
+        _tuple_src("ACTION", action, len(terminals)),
+        _tuple_src("GOTO", goto, len(nonterminals)),
+        "_EOF = (None,)",
+        _DRIVER,
+    ]
+    return "\n".join(parts)
+
+def bind(
+    module: ModuleType,
+    rules: List[Rule],
+    matcher: Matcher[Token],
+    tranx: bool = True,
+) -> Callable[[Iterable[Token]], Any]:
+    """
+    Parse function of a generated module, bound to the rules it was generated
+    from (for their actions) and a matcher with token kinds. Syntax errors
+    raise slang's ParseError, as Grammar.parse does.
+    """
+    if tuple(str(r) for r in rules) != module.RULES:
+        raise Exception("rules don't match the generated parser")
+    if not has_kinds(matcher):
+        raise Exception("generated parsers need a matcher with token kinds")
+    terminals = {sym.s: sym for r in rules for sym in r.pattern if isinstance(sym, Terminal)}
+    terminal_of_kind = {
+        matcher.terminal_kind(terminals[name]): i
+        for (i, name) in enumerate(module.TERMINALS)
+        if i > 0
+    }
+    terminals[EOF.s] = EOF
+    kind = matcher.token_kind
+    parse = module.parse
+
+    def _error(pos: int, tok: Optional[Token], expected: List[str]) -> ParseError:
+        return ParseError(pos, tok, sorted(terminals[name] for name in expected))
+
+    def _parse(toks: Iterable[Token]) -> Any:
+        return parse(toks, kind, terminal_of_kind, rules, tranx, Node, _error)
+
+    return _parse
@@ -1,10 +1,16 @@
 from dataclasses import dataclass
 from typing import (
-    Callable, FrozenSet, Generic, Iterable, Iterator, Mapping, Optional,
-    Set, Tuple, TypeVar, Protocol, List, Union, Any
+    AsyncIterable, Callable, FrozenSet, Generic, Iterable, Iterator, Mapping, Optional,
+    Set, Tuple, TypeVar, Protocol, List, Union, Any, Hashable, Dict
 )
-from collections import defaultdict
+from array import array
+from collections import Counter, defaultdict
 from functools import total_ordering
+from itertools import groupby
+import hashlib
+import json
+import os
+import sys
 
 @total_ordering
 class Symbol(object):
@@ -61,6 +67,24 @@ class Rule(object):
     def __eq__(self, o: object) -> bool:
         return isinstance(o, Rule) and self.rid == o.rid
 
+class Node(object):
+    """
+    Parse tree node, children are tokens and Nodes in pattern order.
+    """
+    __slots__ = ("rule", "children")
+
+    def __init__(self, rule: Rule, children: List[Any]) -> None:
+        self.rule = rule
+        self.children = children
+
+    def __iter__(self) -> Iterator[Any]:
+        # unpacks like the (rule, children) pair it replaces
+        yield self.rule
+        yield self.children
+
+    def __repr__(self) -> str:
+        return F"Node({self.rule}, {self.children})"
+
 class PartialRule(object):
     def __init__(self, rule: Rule, next_pos: int = 0) -> None:
         assert next_pos <= len(rule.pattern), "invalid next_pos"
@@ -99,6 +123,14 @@ class Association(object):
 LeftAssoc = Association("left")
 RightAssoc = Association("right")
 
+@dataclass
+class Construction(object):
+    mode: str
+
+SLR = Construction("slr")
+LALR = Construction("lalr")
+LR1 = Construction("lr1")
+
 def multidict(g, key):
     d = defaultdict(list)
     for r in g:
@@ -106,88 +138,214 @@ def multidict(g, key):
         d[k].append(r)
     return d
 
-def _all_symbols(rules: List[Rule]) -> Set[Symbol]:
-    return {sym for r in rules for sym in r.pattern}.union({
-        r.symbol for r in rules
-    })
-
-def _compute_firsts(
-    rules: List[Rule],
-    rules_map: Mapping[NonTerminal, List[Rule]],
-    symbols: List[Symbol]
-) -> Mapping[Symbol, Set[Terminal]]:
-
-    parital_marker = object()
-    firsts_map = {}
-
-    def first(sym: Symbol) -> Set[Terminal]:
-        if (_exists := firsts_map.get(sym)) is not None:
-            if _exists is parital_marker:
-                raise Exception("loop detected")            
-            elif _exists:  # make type checker happy
-                return _exists
-
-        firsts_map[sym] = parital_marker
-        res = None
-        if isinstance(sym, Terminal):
-            res = {sym}
-        elif isinstance(sym, NonTerminal):
-            rs = rules_map[sym]
-            firsts = set()
-            for r in rs:
-                sym0 = r.pattern[0]
-                if isinstance(sym0, Terminal):
-                    firsts.add(sym0)
-                elif isinstance(sym0, NonTerminal) and sym0 != sym:
-                    firsts.update(first(sym0))
-            res = firsts
-        else:
-            raise Exception("invalid case")
+class SymbolTable(object):
+    """
+    Dense int ids of a grammar's symbols for the table construction, EOF is 0
+    and the others are numbered by first occurrence in the rules, so appending
+    rules keeps the ids. Sets of terminals are int bitmasks over these ids.
+    """
+    def __init__(self, rules: List[Rule]) -> None:
+        self.symbols: List[Symbol] = [EOF]
+        self.ids: Dict[Symbol, int] = {EOF: 0}
+        for r in rules:
+            for sym in (r.symbol, *r.pattern):
+                if sym not in self.ids:
+                    self.ids[sym] = len(self.symbols)
+                    self.symbols.append(sym)
+        self.is_terminal = [isinstance(sym, Terminal) for sym in self.symbols]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def mask(self, syms: Iterable[Symbol]) -> int:
+        m = 0
+        for sym in syms:
+            m |= 1 << self.ids[sym]
+        return m
+
+    def terminals_of(self, mask: int) -> List[Terminal]:
+        return [self.symbols[i] for i in _bits(mask)]
+
+def _bits(mask: int) -> Iterator[int]:
+    # positions of the set bits, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class ItemTable(object):
+    """
+    LR items packed as ints, (rule, dot position) pairs numbered rule by rule,
+    so advancing the dot of item is item + 1. Symbols are symtab ids, next_id
+    of a complete item is -1.
+    """
+    def __init__(self, rules: List[Rule], symtab: Optional[SymbolTable] = None) -> None:
+        self.rules = rules
+        self.symtab = symtab or SymbolTable(rules)
+        ids = self.symtab.ids
+        # per rule, in rules order
+        self.lhs: List[int] = [ids[r.symbol] for r in rules]
+        self.patterns: List[Tuple[int, ...]] = [tuple(ids[sym] for sym in r.pattern) for r in rules]
+        # per item
+        self.rule_of: List[Rule] = []
+        self.pos_of: List[int] = []
+        self.lhs_of: List[int] = []
+        self.pattern_of: List[Tuple[int, ...]] = []
+        self.next_id: List[int] = []
+        self.start_of: Dict[int, int] = {}
+        # items with the dot first by lhs id, empty for terminals
+        self.nt_items: List[List[int]] = [[] for _ in range(len(self.symtab))]
+        for (r, lhs, pattern) in zip(rules, self.lhs, self.patterns):
+            self.start_of[r.rid] = len(self.rule_of)
+            self.nt_items[lhs].append(len(self.rule_of))
+            for pos in range(len(pattern) + 1):
+                self.rule_of.append(r)
+                self.pos_of.append(pos)
+                self.lhs_of.append(lhs)
+                self.pattern_of.append(pattern)
+                self.next_id.append(pattern[pos] if pos < len(pattern) else -1)
+
+    def __len__(self) -> int:
+        return len(self.rule_of)
+
+    def item(self, rule: Rule, pos: int = 0) -> int:
+        return self.start_of[rule.rid] + pos
+
+    def partial(self, item: int) -> PartialRule:
+        return PartialRule(self.rule_of[item], self.pos_of[item])
+
+# by symbol id, (rule index, position) of each occurrence in a pattern
+_T_Occurrences = List[List[Tuple[int, int]]]
+
+def _compute_occurrences(items: ItemTable) -> _T_Occurrences:
+    occurrences = [[] for _ in range(len(items.symtab))]
+    for (k, pattern) in enumerate(items.patterns):
+        for (i, sym) in enumerate(pattern):
+            occurrences[sym].append((k, i))
+    return occurrences
+
+def _compute_nullable(
+    items: ItemTable,
+    occurrences: _T_Occurrences,
+) -> Set[int]:
+    is_terminal = items.symtab.is_terminal
+    # per rule count of symbols not yet known nullable, terminals never are
+    pending = [
+        len(pattern) if not any(is_terminal[sym] for sym in pattern) else -1
+        for pattern in items.patterns
+    ]
+    nullable = set()
+    work = [lhs for (lhs, pattern) in zip(items.lhs, items.patterns) if not pattern]
+    while work:
+        nt = work.pop()
+        if nt in nullable:
+            continue
+        nullable.add(nt)
+        for (k, _) in occurrences[nt]:
+            pending[k] -= 1
+            if pending[k] == 0:
+                work.append(items.lhs[k])
+    return nullable
+
+def _cyclic_symbol(rules: List[Rule]) -> Optional[NonTerminal]:
+    """
+    A nonterminal deriving itself (A =>+ A), if any, it has infinitely many
+    parse trees. Works on the rules directly, cached tables skip the ItemTable.
+    """
+    nullable: Set[Symbol] = set()
+    grown = True
+    while grown:
+        grown = False
+        for r in rules:
+            if r.symbol not in nullable and all(sym in nullable for sym in r.pattern):
+                nullable.add(r.symbol)
+                grown = True
+    # A to each B of its rules A := x B y with x and y nullable
+    units: Dict[Symbol, Set[Symbol]] = defaultdict(set)
+    for r in rules:
+        for (i, sym) in enumerate(r.pattern):
+            if isinstance(sym, NonTerminal) and all(s in nullable for s in (*r.pattern[:i], *r.pattern[i + 1:])):
+                units[r.symbol].add(sym)
+    for nt in list(units):
+        (seen, work) = (set(), list(units[nt]))
+        while work:
+            sym = work.pop()
+            if sym == nt:
+                return nt
+            if sym not in seen:
+                seen.add(sym)
+                work.extend(units.get(sym, ()))
+    return None
+
+def _propagate(
+    sets: List[int],
+    edges: Mapping[int, Set[int]],
+) -> None:
+    """
+    Grow sets to the fixed point of sets[dst] >= sets[src] for each edge src -> dst.
+    """
+    work = [sym for sym in edges if sets[sym]]
+    while work:
+        src = work.pop()
+        for dst in edges[src]:
+            if sets[src] & ~sets[dst]:
+                sets[dst] |= sets[src]
+                work.append(dst)
+
+def _first_of_seq(
+    seq: Iterable[int],
+    firsts: List[int],
+    nullable: Set[int],
+    lookaheads: int,
+) -> int:
+    res = 0
+    for sym in seq:
+        res |= firsts[sym]
+        if sym not in nullable:
+            return res
+    return res | lookaheads
+
+def _first_edges(items: ItemTable, nullable: Set[int]) -> Mapping[int, Set[int]]:
+    # FIRST(sym) flows into FIRST(lhs) for each nonterminal sym of a nullable prefix
+    is_terminal = items.symtab.is_terminal
+    edges = defaultdict(set)
+    for (lhs, pattern) in zip(items.lhs, items.patterns):
+        for sym in pattern:
+            if is_terminal[sym]:
+                break
+            if sym != lhs:
+                edges[sym].add(lhs)
+            if sym not in nullable:
+                break
+    return edges
 
-        firsts_map[sym] = res
-        return res
-    
-    for sym in symbols:
-        first(sym)
-    return firsts_map
+def _compute_firsts(items: ItemTable, nullable: Set[int]) -> List[int]:
+    firsts = [1 << sym if t else 0 for (sym, t) in enumerate(items.symtab.is_terminal)]
+    for (lhs, pattern) in zip(items.lhs, items.patterns):
+        firsts[lhs] |= _first_of_seq(pattern, firsts, nullable, 0)
+    _propagate(firsts, _first_edges(items, nullable))
+    return firsts
 
 def _compute_follows(
-    rules: List[Rule],
-    rules_map: Mapping[NonTerminal, List[Rule]],
-    firsts_map: Mapping[Symbol, Set[Terminal]],
-    symbols: List[Symbol],
-) -> Mapping[NonTerminal, Set[Terminal]]:
-    partial_marker = object()
-    nts_follows = {}
-
-    def _go(nt: Symbol) -> List[Terminal]:
-        # DP Cache
-        if _exists := nts_follows.get(nt):
-            if _exists == partial_marker:
-                raise Exception("loop detected")
-            elif _exists:
-                return _exists
-        nts_follows[nt] = partial_marker
-        # scan
-        follows = set()
-        for r in rules:
-            for (i, sym) in enumerate(r.pattern):
-                if sym == nt:
-                    if i + 1 < len(r.pattern):
-                        sym2 = r.pattern[i+1]
-                        if isinstance(sym2, Terminal):
-                            follows.add(sym2)
-                        elif isinstance(sym2, NonTerminal):
-                            follows.update(firsts_map[sym2])
-                    elif r.symbol != nt:
-                        follows.update(_go(r.symbol))
-        nts_follows[nt] = follows
-        return list(set(follows))
-
-    for sym in symbols:
-        if isinstance(sym, NonTerminal):
-            _go(sym)
-    return nts_follows
+    items: ItemTable,
+    occurrences: _T_Occurrences,
+    firsts: List[int],
+    nullable: Set[int],
+) -> List[int]:
+    is_terminal = items.symtab.is_terminal
+    follows = [0] * len(is_terminal)
+    # FOLLOW(lhs) flows into FOLLOW(nt) when nt ends a rule of lhs up to nullables
+    edges = defaultdict(set)
+    for (nt, occs) in enumerate(occurrences):
+        if is_terminal[nt]:
+            continue
+        for (k, i) in occs:
+            rest = items.patterns[k][i + 1:]
+            follows[nt] |= _first_of_seq(rest, firsts, nullable, 0)
+            if items.lhs[k] != nt and all(sym in nullable for sym in rest):
+                edges[items.lhs[k]].add(nt)
+    _propagate(follows, edges)
+    return follows
 
 T_BFS_ITEM = TypeVar("BFS_ITEM")
 
@@ -199,101 +357,341 @@ def bfs_traverse(
     while steps:
         steps = f(steps)
 
-def _compute_nt_closure_cache(
-    rules: List[Rule],
-    rules_map: Mapping[NonTerminal, List[Rule]],
-    symbols: List[Symbol],
-) -> Mapping[NonTerminal, Set[PartialRule]]:
-    closures = {}
-    for sym in symbols:
-        if isinstance(sym, NonTerminal):
-            closure = set(PartialRule(r) for r in rules_map[sym])
-            nts = set([sym])
-
-            def _go(nts: Set[NonTerminal]):
-                prs = {
-                    PartialRule(r)
-                    for nt in nts
-                    for r in rules_map[nt]
-                }
-                closure.update(prs)
-                this_nts = set()
-                for pr in prs:
-                    if not pr.is_fin():
-                        sym = pr.next_symbol()
-                        if isinstance(sym, NonTerminal):
-                            this_nts.add(sym)
-                return this_nts.difference(nts)
-
-            bfs_traverse(nts, _go)
-            closures[sym] = closure
+# by symbol id, the LR(0) closure of its items, empty for terminals
+_T_ClosureCache = List[FrozenSet[int]]
+
+def _compute_nt_closure_cache(items: ItemTable) -> _T_ClosureCache:
+    (nt_items, next_id) = (items.nt_items, items.next_id)
+    closures = []
+    for nt in range(len(nt_items)):
+        closure = set()
+        seen = {nt}
+        nts = [nt]
+        while nts:
+            for item in nt_items[nts.pop()]:
+                closure.add(item)
+                sym = next_id[item]
+                if sym >= 0 and sym not in seen:
+                    seen.add(sym)
+                    nts.append(sym)
+        closures.append(frozenset(closure))
     return closures
 
 def _compute_closure(
-    partials: Set[PartialRule],
-    closure_cache: Mapping[NonTerminal, Set[PartialRule]]
-) -> FrozenSet[PartialRule]:
-    nexts = set()
-    for p in partials:
-        if not p.is_fin():
-            sym_next = p.next_symbol()
-            if isinstance(sym_next, NonTerminal):
-                nexts.add(sym_next)
-    return frozenset(partials.union({
-        pr
-        for sym in nexts
-        for pr in closure_cache[sym]
-    }))
-
-_T_Closure = FrozenSet[PartialRule]
-_T_Transition = Mapping[Symbol, int]
-
-def _group_by_next_symbol(
-    prs: Iterable[PartialRule]
-) -> Mapping[Symbol, List[PartialRule]]:
-    m = defaultdict(list)
-    for pr in prs:
-        if not pr.is_fin():
-            m[pr.next_symbol()].append(pr)
-    return m
+    kernel: Iterable[int],
+    items: ItemTable,
+    closure_cache: _T_ClosureCache,
+) -> Set[int]:
+    next_id = items.next_id
+    closure = set(kernel)
+    for sym in {next_id[item] for item in kernel}:
+        if sym >= 0:
+            closure.update(closure_cache[sym])
+    return closure
+
+def _components(edges: List[List[int]]) -> List[List[int]]:
+    """
+    Strongly connected components of a graph in topological order, by an
+    iterative Tarjan's algorithm.
+    """
+    n = len(edges)
+    (index, low, on_stack) = ([-1] * n, [0] * n, [False] * n)
+    (stack, comps, counter) = ([], [], 0)
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(edges[root]))]
+        while work:
+            (x, it) = work[-1]
+            for y in it:
+                if index[y] < 0:
+                    index[y] = low[y] = counter
+                    counter += 1
+                    stack.append(y)
+                    on_stack[y] = True
+                    work.append((y, iter(edges[y])))
+                    break
+                if on_stack[y]:
+                    low[x] = min(low[x], index[y])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[x])
+                if low[x] == index[x]:
+                    comp = []
+                    while True:
+                        y = stack.pop()
+                        on_stack[y] = False
+                        comp.append(y)
+                        if y == x:
+                            break
+                    comps.append(comp)
+    comps.reverse()  # found sinks first
+    return comps
+
+def _flow(sets: Any, edges: List[List[int]], comps: Iterable[List[int]]) -> None:
+    """
+    _propagate in one pass, each component of _components gets the union of
+    its sets before flowing on.
+    """
+    for comp in comps:
+        m = 0
+        for x in comp:
+            m |= sets[x]
+        for x in comp:
+            sets[x] = m
+            for y in edges[x]:
+                sets[y] |= m
+
+class _LR1Closures(object):
+    """
+    LR(1) closures of kernels with lookahead masks. The items with the dot
+    first share the lookaheads of their nonterminal, those are solved over
+    the nonterminals a kernel reaches, in topological order of how they flow
+    into each other, so each closure is about linear in its size.
+    """
+    def __init__(self, items: ItemTable, firsts: List[int], nullable: Set[int]) -> None:
+        self.items = items
+        self.firsts = firsts
+        self.nullable = nullable
+        nt_items = items.nt_items
+        # per nonterminal x, (y, FIRST of what follows y) of each rule x := y ...,
+        # and the y that also get the lookaheads of x as what follows is nullable
+        self.spawns: List[List[Tuple[int, int]]] = [[] for _ in nt_items]
+        self.flows: List[List[int]] = [[] for _ in nt_items]
+        for (lhs, pattern) in zip(items.lhs, items.patterns):
+            if pattern and nt_items[pattern[0]]:
+                rest = pattern[1:]
+                self.spawns[lhs].append((pattern[0], _first_of_seq(rest, firsts, nullable, 0)))
+                if pattern[0] != lhs and all(sym in nullable for sym in rest):
+                    self.flows[lhs].append(pattern[0])
+        self.comp_of = [0] * len(nt_items)
+        for (c, comp) in enumerate(_components(self.flows)):
+            for x in comp:
+                self.comp_of[x] = c
+
+    def __call__(self, kernel: Mapping[int, int]) -> Dict[int, int]:
+        items = self.items
+        (next_id, nt_items) = (items.next_id, items.nt_items)
+        las = {}
+        reached = []
+        for (item, item_las) in kernel.items():
+            sym = next_id[item]
+            if sym >= 0 and nt_items[sym]:
+                first = _first_of_seq(items.pattern_of[item][items.pos_of[item] + 1:], self.firsts, self.nullable, item_las)
+                if sym not in las:
+                    las[sym] = 0
+                    reached.append(sym)
+                las[sym] |= first
+        for x in reached:  # grows while iterating
+            for (y, first) in self.spawns[x]:
+                if y not in las:
+                    las[y] = 0
+                    reached.append(y)
+                las[y] |= first
+        # what a kernel reaches is closed under flows, so are its components
+        reached.sort(key=self.comp_of.__getitem__)
+        _flow(las, self.flows, (list(comp) for (_, comp) in groupby(reached, self.comp_of.__getitem__)))
+        closure = dict(kernel)
+        for x in reached:
+            for item in nt_items[x]:
+                closure[item] = closure.get(item, 0) | las[x]
+        return closure
+
+_T_Kernel = Tuple[Any, ...]
+_T_Transition = Mapping[int, int]  # symbol id to state
+
+class States(object):
+    """
+    LR(0) automaton states identified by their kernel items only,
+    closures are recomputed on demand.
+    """
+    def __init__(
+        self,
+        items: ItemTable,
+        closure_cache: Optional[_T_ClosureCache] = None,
+    ) -> None:
+        self.items = items
+        self.kernels: List[_T_Kernel] = []
+        self.ids: Dict[_T_Kernel, int] = {}
+        self._closure_cache = closure_cache
+
+    def __len__(self) -> int:
+        return len(self.kernels)
+
+    def __eq__(self, o: object) -> bool:
+        return type(o) is type(self) and self.kernels == o.kernels
+
+    def add(self, kernel: _T_Kernel) -> Tuple[int, bool]:
+        if (i := self.ids.get(kernel)) is not None:
+            return (i, False)
+        i = self.ids[kernel] = len(self.kernels)
+        self.kernels.append(kernel)
+        return (i, True)
+
+    def closure(self, i: int) -> Mapping[int, int]:
+        """
+        Items of state i with their lookahead masks, 0 for LR(0) items.
+        """
+        if self._closure_cache is None:
+            self._closure_cache = _compute_nt_closure_cache(self.items)
+        return dict.fromkeys(_compute_closure(self.kernels[i], self.items, self._closure_cache), 0)
+
+class LR1States(States):
+    # kernels are sorted (item, lookahead mask) pairs
+    def __init__(
+        self,
+        items: ItemTable,
+        firsts: Optional[List[int]] = None,
+        nullable: Optional[Set[int]] = None,
+    ) -> None:
+        super().__init__(items)
+        self._firsts = firsts
+        self._nullable = nullable
+        self._closures = None
+
+    def closure(self, i: int) -> Mapping[int, int]:
+        if self._firsts is None:
+            self._nullable = _compute_nullable(self.items, _compute_occurrences(self.items))
+            self._firsts = _compute_firsts(self.items, self._nullable)
+        if self._closures is None:
+            self._closures = _LR1Closures(self.items, self._firsts, self._nullable)
+        return self._closures(dict(self.kernels[i]))
 
 def _compute_states(
-    rules: List[Rule],
-    rules_map: Mapping[NonTerminal, List[Rule]],
-    closure_cache: Mapping[NonTerminal, Set[PartialRule]],
+    items: ItemTable,
+    closure_cache: _T_ClosureCache,
     init_rule: Rule,
-) -> Tuple[Mapping[_T_Closure, int], Mapping[int, _T_Transition]]:
-    st0 = _compute_closure(set([PartialRule(init_rule)]), closure_cache)
-    states = {frozenset(st0): 0}
-    st_no = [0]
+) -> Tuple[States, Mapping[int, _T_Transition]]:
+    states = States(items, closure_cache)
+    states.add((items.item(init_rule),))
     transitions = defaultdict(dict)
-
-    def _states_go(states_in: Set[_T_Closure]):
-        new_states = set()
-        for state in states_in:
-            flws = _group_by_next_symbol(state)
-            for (sym, sub_rules) in flws.items():
-                new_st = _compute_closure(
-                    set(pr.advance() for pr in sub_rules if not pr.is_fin()),
-                    closure_cache)
-                if new_st not in states:
-                    # add new state
-                    st_no[0] += 1
-                    states[new_st] = st_no[0]
-                    # for next iteration of BFS
-                    new_states.add(new_st)
+    next_id = items.next_id
+
+    def _states_go(states_in: List[int]):
+        new_states = []
+        for i in states_in:
+            groups = defaultdict(list)
+            for item in _compute_closure(states.kernels[i], items, closure_cache):
+                if (sym := next_id[item]) >= 0:
+                    groups[sym].append(item + 1)
+            for (sym, kernel) in groups.items():
+                (j, is_new) = states.add(tuple(sorted(kernel)))
+                if is_new:
+                    new_states.append(j)
                 # each (state, sym) is unique, so no overwrite will occur
-                transitions[states[state]][sym] = states[new_st]
+                transitions[i][sym] = j
         return new_states
 
-    bfs_traverse(set(states.keys()), _states_go)
+    bfs_traverse([0], _states_go)
     return (states, transitions)
 
-def print_states(states: Mapping[FrozenSet[PartialRule], int]):
-    for (i, s) in sorted((i, s) for (s, i) in states.items()):
+# per state, (lookahead mask, rule) of each complete item
+_T_Reduces = Mapping[int, List[Tuple[int, Rule]]]
+
+def _compute_slr_reduces(
+    states: States,
+    follows: List[int],
+) -> _T_Reduces:
+    items = states.items
+    (lhs_of, rule_of, next_id) = (items.lhs_of, items.rule_of, items.next_id)
+    return {
+        i: [
+            (follows[lhs_of[item]], rule_of[item])
+            for item in states.closure(i)
+            if next_id[item] < 0
+        ]
+        for i in range(len(states))
+    }
+
+def _compute_lalr_reduces(
+    states: States,
+    transitions: Mapping[int, _T_Transition],
+    firsts: List[int],
+    nullable: Set[int],
+) -> _T_Reduces:
+    """
+    Lookaheads of kernel items by spontaneous generation and propagation
+    over the LR(0) automaton (Dragon Book 4.7.5).
+    """
+    items = states.items
+    (rule_of, next_id) = (items.rule_of, items.next_id)
+    mark = 1 << len(items.symtab)  # placeholder lookahead for propagation
+    # kernel items of all states numbered
+    nodes = {(i, item): n for (n, (i, item)) in enumerate(
+        (i, item) for (i, kernel) in enumerate(states.kernels) for item in kernel)}
+    lookaheads = [0] * len(nodes)
+    propagates = [[] for _ in nodes]
+    closures = _LR1Closures(items, firsts, nullable)
+    item_closures = {}
+    for (i, kernel) in enumerate(states.kernels):
+        for item in kernel:
+            # the closure of a single item doesn't depend on the state
+            if (closure := item_closures.get(item)) is None:
+                closure = item_closures[item] = closures({item: mark})
+            for (item2, las) in closure.items():
+                if (sym := next_id[item2]) < 0:
+                    continue
+                dst = nodes[(transitions[i][sym], item2 + 1)]
+                if las & mark:
+                    propagates[nodes[(i, item)]].append(dst)
+                lookaheads[dst] |= las & ~mark
+    _flow(lookaheads, propagates, _components(propagates))
+    reduces = {}
+    for (i, kernel) in enumerate(states.kernels):
+        closure = closures({item: lookaheads[nodes[(i, item)]] for item in kernel})
+        reduces[i] = [(las, rule_of[item]) for (item, las) in closure.items() if next_id[item] < 0]
+    return reduces
+
+def _compute_lr1_states(
+    items: ItemTable,
+    firsts: List[int],
+    nullable: Set[int],
+    init_rule: Rule,
+) -> Tuple[LR1States, Mapping[int, _T_Transition]]:
+    states = LR1States(items, firsts, nullable)
+    states.add(((items.item(init_rule), 0),))
+    transitions = defaultdict(dict)
+    next_id = items.next_id
+
+    def _states_go(states_in: List[int]):
+        new_states = []
+        for i in states_in:
+            groups = defaultdict(list)
+            for (item, las) in states.closure(i).items():
+                if (sym := next_id[item]) >= 0:
+                    groups[sym].append((item + 1, las))
+            for (sym, kernel) in groups.items():
+                (j, is_new) = states.add(tuple(sorted(kernel)))
+                if is_new:
+                    new_states.append(j)
+                transitions[i][sym] = j
+        return new_states
+
+    bfs_traverse([0], _states_go)
+    return (states, transitions)
+
+def _compute_lr1_reduces(states: LR1States) -> _T_Reduces:
+    (rule_of, next_id) = (states.items.rule_of, states.items.next_id)
+    return {
+        i: [(las, rule_of[item]) for (item, las) in states.closure(i).items() if next_id[item] < 0]
+        for i in range(len(states))
+    }
+
+def print_states(states: States):
+    items = states.items
+    for i in range(len(states)):
         print(F"STATE[{i}]")
-        for pr in sorted(s, key=lambda pr: pr.rule.rid):
-            print(F"  {str(pr)}")
+        for (item, las) in sorted(states.closure(i).items()):
+            if las:
+                las_str = "/".join(sorted(str(la) for la in items.symtab.terminals_of(las)))
+                print(F"  {items.partial(item)}, {las_str}")
+            else:
+                print(F"  {items.partial(item)}")
 
 Action = Union[int, Rule]
 Goto = int
@@ -330,63 +728,87 @@ def _compute_assoc_preced_mapping(
                 r_2_preced[r] = (i, assoc)
     return (r_2_preced, t_2_preced)
 
+T_Conflicts = Mapping[int, Mapping[Terminal, Tuple[Action, ...]]]
+
 def _compute_parsing_table(
-    states: Mapping[_T_Closure, int],
+    states: States,
     transitions: Mapping[int, _T_Transition],
-    follows: Mapping[NonTerminal, Set[Terminal]],
+    state_reduces: _T_Reduces,
     assoc_preced_defs: T_AssocPrecedDefs,
+    conflicts: Optional[Dict[int, Dict[Terminal, Tuple[Action, ...]]]] = None,
 ) -> ParsingTable:
+    """
+    :param conflicts: if given, conflicts precedence can't resolve are collected
+        here instead of raised, the table then prefers shift, then the first rule
+    """
+    symtab = states.items.symtab
+    return {
+        i: _compute_row(i, transitions[i], state_reduces[i], symtab, assoc_preced_defs, conflicts)
+        for i in range(len(states))
+    }
+
+def _compute_row(
+    i: int,
+    transitions: _T_Transition,
+    reduces: List[Tuple[int, Rule]],
+    symtab: SymbolTable,
+    assoc_preced_defs: T_AssocPrecedDefs,
+    conflicts: Optional[Dict[int, Dict[Terminal, Tuple[Action, ...]]]] = None,
+) -> Tuple[Dict[Terminal, Action], Dict[NonTerminal, Goto]]:
+    """
+    Row of state i keyed by Symbols, transitions and reduce lookaheads are by symtab id.
+    """
     (r_2_preced, t_2_preced) = assoc_preced_defs
-    table = []
-    for (i, s) in sorted((i, s) for (s, i) in states.items()):
-        actions = []
-        gotos = []
-        for (sym, dst) in transitions[i].items():
-            if isinstance(sym, NonTerminal):  # non-terminal
-                gotos.append((sym, dst))
-            elif isinstance(sym, Terminal):
-                if sym is EOF:
-                    actions.append((sym, -1))
-                else:
-                    actions.append((sym, dst))
-        # >>> SLR
-        reduces = [
-            (sym, pr.rule)
-            for pr in s
-            if pr.is_fin()
-            for sym in follows[pr.rule.symbol]
-        ]
-        actions_map = dict(actions)
-        reduces_map = dict(reduces)
-        merged_actions = []
-        for sym in set(actions_map.keys()).union(reduces_map):
-            sft = actions_map.get(sym)
-            rdc = reduces_map.get(sym)
-            act = None
-            if sft and rdc:
-                try:
-                    sft_preced = t_2_preced[sym]
-                    rdc_preced = r_2_preced[rdc]
-                except KeyError:
+    (symbols, is_terminal) = (symtab.symbols, symtab.is_terminal)
+    actions_map = {}
+    gotos = {}
+    for (s, dst) in transitions.items():
+        if not is_terminal[s]:
+            gotos[symbols[s]] = dst
+        elif s == 0:  # EOF
+            actions_map[s] = -1
+        else:
+            actions_map[s] = dst
+    reduces_map = {}
+    for (las, rule) in reduces:
+        for t in _bits(las):
+            if (rdcs := reduces_map.get(t)) is None:
+                reduces_map[t] = [rule]
+            elif rule not in rdcs:
+                rdcs.append(rule)
+    # only the ids with a reduce need merging
+    for (t, rdcs) in reduces_map.items():
+        sym = symbols[t]
+        sft = actions_map.get(t)
+        rdcs = sorted(rdcs, key=lambda r: r.rid)
+        if len(rdcs) > 1:
+            if conflicts is None:
+                raise Exception(F"REDUCE-REDUCE Conflict on {sym} between {rdcs}")
+            conflicts.setdefault(i, {})[sym] = tuple(([sft] if sft else []) + rdcs)
+            act = sft or rdcs[0]
+        elif sft:
+            rdc = rdcs[0]
+            try:
+                sft_preced = t_2_preced[sym]
+                rdc_preced = r_2_preced[rdc]
+            except KeyError:
+                if conflicts is None:
                     raise Exception(F"SHIFT-REDUCE Conflict, maybe specify an AssocPreced for {sym}")
+                conflicts.setdefault(i, {})[sym] = (sft, rdc)
+                act = sft
+            else:
                 if sft_preced > rdc_preced:
-                    act = (sym, sft)
+                    act = sft
                 elif sft_preced < rdc_preced:
-                    act = (sym, rdc)
+                    act = rdc
                 elif sft_preced[1] == LeftAssoc:
-                    act = (sym, rdc)
+                    act = rdc
                 elif sft_preced[1] == RightAssoc:
-                    act = (sym, sft)
-            elif sft:
-                act = (sym, sft)
-            elif rdc:
-                act = (sym, rdc)
-            assert act is not None
-            merged_actions.append(act)
-
-        actions.extend(reduces)
-        table.append((i, (dict(merged_actions), dict(gotos))))
-    return dict(table)
+                    act = sft
+        else:
+            act = rdcs[0]
+        actions_map[t] = act
+    return ({symbols[t]: act for (t, act) in actions_map.items()}, gotos)
 
 Token = TypeVar("Token")
 
@@ -394,15 +816,406 @@ class Matcher(Protocol[Token]):
     # EOF matches None regardlessly
     def match(self, sym: Terminal, tok: Token) -> bool: ...
 
+class KindMatcher(Matcher[Token], Protocol[Token]):
+    # optional classifier hooks, a matcher providing both enables
+    # table dispatch by token kind instead of scanning with match
+    def token_kind(self, tok: Token) -> Hashable: ...
+    def terminal_kind(self, sym: Terminal) -> Hashable: ...
+
 def match(matcher: Matcher[Token], sym: Terminal, tok: Optional[Token]):
     return sym == EOF if tok is None else matcher.match(sym, tok) 
 
+class ParseError(Exception):
+    """
+    Syntax error at the pos-th token (EOF is the one after the last),
+    expected are the terminals the parser could act on there.
+    """
+    def __init__(self, pos: int, token: Any, expected: List[Terminal]) -> None:
+        self.pos = pos
+        self.token = token
+        self.expected = expected
+        tok = "eof" if token is None else repr(token)
+        super().__init__(F"parse error at token {pos}: {tok}, expected {', '.join(map(str, expected)) or 'nothing'}")
+
 def next_token(toks: Iterator[Token]) -> Optional[Token]:
     try:
         return next(toks)
     except StopIteration:
         return None
 
+def has_kinds(matcher: Matcher[Token]) -> bool:
+    return hasattr(matcher, "token_kind") and hasattr(matcher, "terminal_kind")
+
+class _ScanRow(object):
+    # fallback for matchers without kind hooks, tries each terminal in turn
+    def __init__(self, actions: Mapping[Terminal, Action], matcher: Matcher[Token]) -> None:
+        self.actions = actions
+        self.matcher = matcher
+
+    def get(self, tok: Optional[Token]) -> Optional[Action]:
+        for (sym, item) in self.actions.items():
+            if match(self.matcher, sym, tok):
+                return item
+        return None
+
+DispatchTable = List[Mapping[Hashable, Action]]
+
+def _compute_dispatch(
+    action_rows: List[Mapping[Terminal, Any]],
+    matcher: Matcher[Token],
+) -> DispatchTable:
+    """
+    Re-key each action row by token kind, EOF is keyed by None.
+    """
+    if not has_kinds(matcher):
+        return [_ScanRow(actions, matcher) for actions in action_rows]
+    kinds: Dict[Hashable, Terminal] = {}
+    rows = []
+    for actions in action_rows:
+        row = {}
+        for (sym, act) in actions.items():
+            k = None if sym == EOF else matcher.terminal_kind(sym)
+            if kinds.setdefault(k, sym) != sym:
+                raise Exception(F"{sym} and {kinds[k]} share token kind {k}")
+            row[k] = act
+        rows.append(row)
+    return rows
+
+def _pack_rows(rows: List[Mapping[int, int]], width: int) -> Tuple[array, array, array]:
+    """
+    First fit row displacement of sparse rows of width columns into one comb
+    vector, denser rows go first. Returns (base, check, value), the entry of
+    (row, col) is value[base[row] + col] when check there is row, the tail is
+    padded so any base + col is in range, also for columns without entries.
+    """
+    base = array("i", [0] * len(rows))
+    check = array("i")
+    value = array("i")
+    free = 0  # every slot below is taken
+    for i in sorted(range(len(rows)), key=lambda i: -len(rows[i])):
+        row = rows[i]
+        if not row:
+            continue
+        cols = sorted(row)
+        b = max(0, free - cols[0])
+        while any(b + c < len(check) and check[b + c] != -1 for c in cols):
+            b += 1
+        if b + cols[-1] >= len(check):
+            check.extend([-1] * (b + cols[-1] + 1 - len(check)))
+            value.extend([0] * (b + cols[-1] + 1 - len(value)))
+        for c in cols:
+            check[b + c] = i
+            value[b + c] = row[c]
+        base[i] = b
+        while free < len(check) and check[free] != -1:
+            free += 1
+    pad = max(base, default=0) + width - len(check)
+    if pad > 0:
+        check.extend([-1] * pad)
+        value.extend([0] * pad)
+    return (base, check, value)
+
+class CompactTable(object):
+    """
+    ParsingTable packed into int arrays indexed by symbol id, terminals are
+    numbered with EOF as 0. Each state's most common reduce becomes its default
+    and those entries are dropped, so an error may only be detected after
+    some default reductions, right before the next shift.
+
+    Action codes: 0 error, -1 accept, s + 1 shift to s, -2 - r reduce rules[r].
+    """
+    def __init__(self, table: ParsingTable, symbols: List[Symbol], rules: List[Rule]) -> None:
+        self.rules = rules
+        self.terminals = [EOF] + sorted(sym for sym in symbols if isinstance(sym, Terminal) and sym != EOF)
+        self.nonterminals = sorted(sym for sym in symbols if isinstance(sym, NonTerminal))
+        self.terminal_ids = {sym: i for (i, sym) in enumerate(self.terminals)}
+        self.nonterminal_ids = {sym: i for (i, sym) in enumerate(self.nonterminals)}
+        self.rule_size = array("i", [len(r.pattern) for r in rules])
+        self.rule_lhs = array("i", [self.nonterminal_ids[r.symbol] for r in rules])
+        r_ids = {r.rid: i for (i, r) in enumerate(rules)}
+
+        def _code(act: Action) -> int:
+            if isinstance(act, Rule):
+                return -2 - r_ids[act.rid]
+            return -1 if act == -1 else act + 1
+
+        self.defaults = array("i")
+        # per state the terminal ids its default covers as a bitmask, for errors
+        self.covers: List[int] = []
+        action_rows = []
+        goto_rows = []
+        for i in range(len(table)):
+            (actions, gotos) = table[i]
+            row = {self.terminal_ids[sym]: _code(act) for (sym, act) in actions.items()}
+            reduces = Counter(code for code in row.values() if code < -1)
+            default = reduces.most_common(1)[0][0] if reduces else 0
+            self.defaults.append(default)
+            self.covers.append(sum(1 << t for (t, code) in row.items() if code == default) if default else 0)
+            action_rows.append({t: code for (t, code) in row.items() if code != default})
+            goto_rows.append({self.nonterminal_ids[sym]: dst for (sym, dst) in gotos.items()})
+        (self.action_base, self.action_check, self.action_value) = _pack_rows(action_rows, len(self.terminals))
+        (self.goto_base, self.goto_check, self.goto_value) = _pack_rows(goto_rows, len(self.nonterminals))
+
+    def __len__(self) -> int:
+        return len(self.defaults)
+
+    def _decode(self, code: int) -> Optional[Action]:
+        if code == 0:
+            return None
+        if code < -1:
+            return self.rules[-2 - code]
+        return -1 if code == -1 else code - 1
+
+    def action(self, state: int, sym: Terminal) -> Optional[Action]:
+        idx = self.action_base[state] + self.terminal_ids[sym]
+        if self.action_check[idx] == state:
+            return self._decode(self.action_value[idx])
+        return self._decode(self.defaults[state])
+
+    def goto(self, state: int, sym: NonTerminal) -> Optional[int]:
+        idx = self.goto_base[state] + self.nonterminal_ids[sym]
+        return self.goto_value[idx] if self.goto_check[idx] == state else None
+
+    def default(self, state: int) -> Optional[Rule]:
+        return self._decode(self.defaults[state])
+
+    def expected(self, state: int) -> List[Terminal]:
+        """
+        Terminals state acts on, those of its default reduce included, as
+        they are in the uncompressed row.
+        """
+        (base, cover) = (self.action_base[state], self.covers[state])
+        return [
+            sym for (t, sym) in enumerate(self.terminals)
+            if self.action_check[base + t] == state or cover >> t & 1
+        ]
+
+    def __getitem__(self, state: int) -> Tuple[Dict[Terminal, Action], Dict[NonTerminal, int]]:
+        """
+        Explicit entries of a state like a ParsingTable row, the default reduce excluded.
+        """
+        actions = {}
+        for (t, sym) in enumerate(self.terminals):
+            idx = self.action_base[state] + t
+            if self.action_check[idx] == state:
+                actions[sym] = self._decode(self.action_value[idx])
+        gotos = {}
+        for sym in self.nonterminals:
+            if (dst := self.goto(state, sym)) is not None:
+                gotos[sym] = dst
+        return (actions, gotos)
+
+    def nbytes(self) -> int:
+        arrays = [
+            self.defaults, self.rule_size, self.rule_lhs,
+            self.action_base, self.action_check, self.action_value,
+            self.goto_base, self.goto_check, self.goto_value,
+        ]
+        return sum(a.itemsize * len(a) for a in arrays) + sum(sys.getsizeof(m) for m in self.covers)
+
+class _PendingRow(object):
+    # stands in LazyTable.dispatch and gotos until its state is built
+    __slots__ = ("table", "i")
+
+    def __init__(self, table: "LazyTable", i: int) -> None:
+        self.table = table
+        self.i = i
+
+    def get(self, key: Hashable) -> Optional[Action]:
+        self.table[self.i]
+        return self.table.dispatch[self.i].get(key)
+
+    def __getitem__(self, sym: NonTerminal) -> Goto:
+        return self.table[self.i][1][sym]
+
+class LazyTable(object):
+    """
+    SLR or LR(1) ParsingTable whose states and rows are built the first time
+    they are looked up, conflicts only surface then. dispatch and gotos are
+    Grammar's rows for Parser, with placeholders for states not built yet.
+    """
+    def __init__(
+        self,
+        rules: List[Rule],
+        op_defs: List[Tuple[Association, List[Terminal]]],
+        matcher: Matcher[Token],
+        mode: Construction,
+    ) -> None:
+        items = ItemTable(rules)
+        occurrences = _compute_occurrences(items)
+        nullable = _compute_nullable(items, occurrences)
+        firsts = _compute_firsts(items, nullable)
+        if mode == LR1:
+            self.states = LR1States(items, firsts, nullable)
+            self.states.add(((items.item(rules[0]), 0),))
+            self._follows = None
+        else:
+            self.states = States(items)
+            self.states.add((items.item(rules[0]),))
+            self._follows = _compute_follows(items, occurrences, firsts, nullable)
+        self._assoc_preced_defs = _compute_assoc_preced_mapping(rules, op_defs)
+        self._matcher = matcher
+        self.rows: Dict[int, Tuple[Dict[Terminal, Action], Dict[NonTerminal, Goto]]] = {}
+        pending = _PendingRow(self, 0)
+        self.dispatch: List[Any] = [pending]
+        self.gotos: List[Any] = [pending]
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __getitem__(self, i: int) -> Tuple[Dict[Terminal, Action], Dict[NonTerminal, Goto]]:
+        if (row := self.rows.get(i)) is None:
+            row = self._build(i)
+        return row
+
+    def _build(self, i: int) -> Tuple[Dict[Terminal, Action], Dict[NonTerminal, Goto]]:
+        states = self.states
+        items = states.items
+        lr1 = self._follows is None
+        groups = defaultdict(list)
+        reduces = []
+        for (item, las) in states.closure(i).items():
+            if (sym := items.next_id[item]) < 0:
+                reduces.append((las if lr1 else self._follows[items.lhs_of[item]], items.rule_of[item]))
+            else:
+                groups[sym].append((item + 1, las) if lr1 else item + 1)
+        transitions = {}
+        for (sym, kernel) in groups.items():
+            (j, is_new) = states.add(tuple(sorted(kernel)))
+            if is_new:
+                pending = _PendingRow(self, j)
+                self.dispatch.append(pending)
+                self.gotos.append(pending)
+            transitions[sym] = j
+        row = self.rows[i] = _compute_row(i, transitions, reduces, items.symtab, self._assoc_preced_defs)
+        self.dispatch[i] = _compute_dispatch([row[0]], self._matcher)[0]
+        self.gotos[i] = row[1]
+        return row
+
+    def complete(self) -> None:
+        """
+        Build every state reachable, as an eager table would have.
+        """
+        i = 0
+        while i < len(self.states):
+            self[i]
+            i += 1
+
+TABLE_FORMAT = 2
+
+def _symbol_key(sym: Symbol) -> str:
+    return ("T:" if isinstance(sym, Terminal) else "N:") + sym.s
+
+def _fingerprint(
+    rules: List[Rule],
+    op_defs: List[Tuple[Association, List[Terminal]]],
+    mode: Construction,
+    glr: bool,
+) -> str:
+    """
+    Digest of everything the table depends on, semantic actions excluded.
+    """
+    desc = {
+        "format": TABLE_FORMAT,
+        "mode": mode.mode,
+        "glr": glr,
+        "rules": [
+            [r.rid, _symbol_key(r.symbol), [_symbol_key(sym) for sym in r.pattern]]
+            for r in rules
+        ],
+        "op_defs": [[assoc.assoc, [_symbol_key(t) for t in ts]] for (assoc, ts) in op_defs],
+    }
+    return hashlib.sha256(json.dumps(desc).encode("utf-8")).hexdigest()
+
+def _dump_table(
+    symbols: List[Symbol],
+    states: States,
+    table: ParsingTable,
+    conflicts: T_Conflicts,
+) -> dict:
+    # symbols by position (their symtab ids), shift/accept as non-negative/-1,
+    # reduce of rid as -2-rid
+    sym_ids = {sym: i for (i, sym) in enumerate(symbols)}
+
+    def _act(act: Action) -> int:
+        return -2 - act.rid if isinstance(act, Rule) else act
+
+    return {
+        "format": TABLE_FORMAT,
+        "symbols": [_symbol_key(sym) for sym in symbols],
+        # kernel items only, LR(1) ones with their lookaheads
+        "states": [
+            [[item, list(_bits(las))] for (item, las) in kernel]
+            if isinstance(states, LR1States) else list(kernel)
+            for kernel in states.kernels
+        ],
+        "table": [
+            [
+                [[sym_ids[sym], _act(act)] for (sym, act) in table[i][0].items()],
+                [[sym_ids[sym], dst] for (sym, dst) in table[i][1].items()],
+            ]
+            for i in range(len(table))
+        ],
+        "conflicts": [
+            [i, sym_ids[sym], [_act(act) for act in acts]]
+            for (i, row) in conflicts.items()
+            for (sym, acts) in row.items()
+        ],
+    }
+
+def _load_table(
+    data: dict,
+    rules: List[Rule],
+    mode: Construction,
+) -> Tuple[List[Symbol], Callable[[], States], ParsingTable, T_Conflicts]:
+    """
+    The table of a dump, the states are rebuilt by the returned function
+    only when asked for. Raises ValueError, KeyError, TypeError or IndexError
+    on a dump that doesn't fit rules.
+    """
+    by_key = {_symbol_key(EOF): EOF}
+    for r in rules:
+        for sym in (r.symbol, *r.pattern):
+            by_key[_symbol_key(sym)] = sym
+    by_rid = {r.rid: r for r in rules}
+    symbols = [by_key[k] for k in data["symbols"]]
+    n = len(data["table"])
+    if len(data["states"]) != n:
+        raise ValueError("states and table rows differ in number")
+
+    def _state(i: int) -> int:
+        if i.__class__ is not int or not 0 <= i < n:
+            raise ValueError(F"invalid state {i!r}")
+        return i
+
+    def _act(code: int) -> Action:
+        return by_rid[-2 - code] if code < -1 else code if code == -1 else _state(code)
+
+    def _states() -> States:
+        symtab = SymbolTable(rules)
+        items = ItemTable(rules, symtab)
+        if mode == LR1:
+            states = LR1States(items)
+            for kernel in data["states"]:
+                states.add(tuple((item, symtab.mask(symbols[la] for la in las)) for (item, las) in kernel))
+        else:
+            states = States(items)
+            for kernel in data["states"]:
+                states.add(tuple(kernel))
+        return states
+
+    table = {
+        i: (
+            {symbols[sym]: _act(act) for (sym, act) in actions},
+            {symbols[sym]: _state(dst) for (sym, dst) in gotos},
+        )
+        for (i, (actions, gotos)) in enumerate(data["table"])
+    }
+    conflicts = {}
+    for (i, sym, acts) in data["conflicts"]:
+        conflicts.setdefault(_state(i), {})[symbols[sym]] = tuple(_act(act) for act in acts)
+    return (symbols, _states, table, conflicts)
+
 class Grammar(Generic[Token]):
     rules: List[Rule]
 
@@ -410,63 +1223,174 @@ class Grammar(Generic[Token]):
         self,
         rules: List[Rule],
         op_defs: List[Tuple[Association, List[Terminal]]],
-        matcher: Matcher[Token]
+        matcher: Matcher[Token],
+        cache_dir: Optional[str] = None,
+        mode: Construction = SLR,
+        glr: bool = False,
+        compact: bool = False,
+        lazy: bool = False,
     ) -> None:
+        """
+        :param cache_dir: if given, the parsing table is loaded from (or saved to)
+            a file named after the grammar fingerprint in this directory
+        :param mode: SLR, LALR (LR(0) states with LALR(1) lookaheads)
+            or LR1 (canonical LR(1) states)
+        :param glr: keep unresolved conflicts for slang.glr instead of raising,
+            the grammar must not have a nonterminal deriving itself
+        :param compact: keep the table as a CompactTable, the matcher needs token kinds
+        :param lazy: build states when parsing first reaches them, see LazyTable,
+            SLR or LR1 only and without cache_dir, glr or compact
+        """
+        if compact and not has_kinds(matcher):
+            raise Exception("compact tables need a matcher with token kinds")
+        if glr and (nt := _cyclic_symbol(rules)) is not None:
+            raise Exception(F"{nt} derives itself, glr needs a grammar without cycles")
         self.rules = rules
+        self.op_defs = op_defs
         self.matcher = matcher
-        rules_map = multidict(rules, key=lambda r: r.symbol)
-        symbols = list(_all_symbols(self.rules))
-        firsts = _compute_firsts(rules, rules_map, symbols)
-        follows = _compute_follows(rules, rules_map, firsts, symbols)
-        nt_closure_cache = _compute_nt_closure_cache(rules, rules_map, symbols)
-        (states, transitions) = _compute_states(rules, rules_map, nt_closure_cache, rules[0])
-        assoc_preced_defs = _compute_assoc_preced_mapping(rules, op_defs)
-        table = _compute_parsing_table(states, transitions, follows, assoc_preced_defs)
-        # self._rules_map = rules_map
+        self.mode = mode
+        self.glr = glr
+        self.compact = compact
+        self.lazy = lazy
+        self.fingerprint = _fingerprint(rules, op_defs, mode, glr)
+        if lazy:
+            if mode == LALR or cache_dir or glr or compact:
+                raise Exception("lazy tables are SLR or LR1 only, without cache_dir, glr or compact")
+            self.table = LazyTable(rules, op_defs, matcher, mode)
+            self.states = self.table.states
+            self.symbols = self.states.items.symtab.symbols
+            self.conflicts = {}
+            self.dispatch = self.table.dispatch
+            self.gotos = self.table.gotos
+            return
+        cache_file = cache_dir and os.path.join(cache_dir, F"{self.fingerprint}.json")
+        loaded = None
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file) as f:
+                    loaded = _load_table(json.load(f), rules, mode)
+            except (ValueError, KeyError, TypeError, IndexError):
+                loaded = None  # stale or corrupted, rebuild
+        if loaded:
+            (symbols, states, table, conflicts) = loaded
+        else:
+            (symbols, states, table, conflicts) = self._build()
+            if cache_file:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_file = F"{cache_file}.{os.getpid()}.tmp"
+                with open(tmp_file, "w") as f:
+                    json.dump(_dump_table(symbols, states, table, conflicts), f, separators=(",", ":"))
+                os.replace(tmp_file, cache_file)
         self.symbols = symbols
-        # self._firsts = firsts
-        # self._follows = follows
-        # self._nt_closure_cache = nt_closure_cache
         self.states = states
-        self.table = table
-
-    def parse(self, toks: Iterator[Token]):
-        stack = []
-        states = [0]
-        lookahead = next_token(toks)
-
-        def act_of_tok(tok, defs):
-            for (sym, item) in defs.items():
-                if match(self.matcher, sym, tok):
-                    return item
+        self.conflicts = conflicts
+        if glr or not compact:
+            self.gotos = [table[i][1] for i in range(len(table))]
+        if glr:
+            self.glr_dispatch = _compute_dispatch([
+                {sym: conflicts.get(i, {}).get(sym, (act,)) for (sym, act) in table[i][0].items()}
+                for i in range(len(table))
+            ], self.matcher)
+        if compact:
+            self.table = CompactTable(table, symbols, rules)
+            self.terminal_of_kind = {}
+            for (i, sym) in enumerate(self.table.terminals[1:], 1):
+                k = matcher.terminal_kind(sym)
+                if self.terminal_of_kind.setdefault(k, i) != i:
+                    raise Exception(F"{sym} and {self.table.terminals[self.terminal_of_kind[k]]} share token kind {k}")
+        else:
+            self.table = table
+            self.dispatch = _compute_dispatch([table[i][0] for i in range(len(table))], self.matcher)
+
+    @property
+    def states(self) -> States:
+        # those of a table loaded from the cache are rebuilt on first use
+        if callable(self._states):
+            states = self._states()
+            if len(states) != len(self.table):
+                raise Exception(F"cached table has {len(self.table)} states, the grammar has {len(states)}")
+            self._states = states
+        return self._states
+
+    @states.setter
+    def states(self, states: Union[States, Callable[[], States]]) -> None:
+        self._states = states
+
+    def _build(self) -> Tuple[List[Symbol], States, ParsingTable, T_Conflicts]:
+        rules = self.rules
+        symtab = SymbolTable(rules)
+        items = ItemTable(rules, symtab)
+        occurrences = _compute_occurrences(items)
+        nullable = _compute_nullable(items, occurrences)
+        firsts = _compute_firsts(items, nullable)
+        if self.mode == LR1:
+            (states, transitions) = _compute_lr1_states(items, firsts, nullable, rules[0])
+            reduces = _compute_lr1_reduces(states)
+        else:
+            nt_closure_cache = _compute_nt_closure_cache(items)
+            (states, transitions) = _compute_states(items, nt_closure_cache, rules[0])
+            if self.mode == LALR:
+                reduces = _compute_lalr_reduces(states, transitions, firsts, nullable)
             else:
-                raise Exception("parse error")
+                follows = _compute_follows(items, occurrences, firsts, nullable)
+                reduces = _compute_slr_reduces(states, follows)
+        assoc_preced_defs = _compute_assoc_preced_mapping(rules, self.op_defs)
+        conflicts = {} if self.glr else None
+        table = _compute_parsing_table(states, transitions, reduces, assoc_preced_defs, conflicts)
+        return (symtab.symbols, states, table, conflicts or {})
+
+    def extend(
+        self,
+        rules: List[Tuple[NonTerminal, List[Symbol], Callable[[Any], Any]]],
+        op_defs: Iterable[Tuple[Association, List[Terminal]]] = (),
+    ) -> "Grammar[Token]":
+        """
+        A new grammar with more rules (given as to grammar) and op_defs appended,
+        built from scratch with the same options. The matcher must know any
+        new terminals.
+        """
+        rid = max(r.rid for r in self.rules) + 1
+        return Grammar(
+            self.rules + [Rule(rid + i, *args) for (i, args) in enumerate(rules)],
+            self.op_defs + list(op_defs),
+            self.matcher, mode=self.mode, glr=self.glr, compact=self.compact,
+        )
 
-        while True:
-            state = states[-1]
-            if state == -1:
-                break
-            actions = self.table[state][0]
-            action = act_of_tok(lookahead, actions)
-            from slang.stlc.lexer import ARROW
-            if isinstance(action, int):
-                # shift
-                stack.append(lookahead)
-                # states.append(state)
-                lookahead = next_token(toks)
-                states.append(action)
-            else:
-                # reuce
-                size = len(action.pattern)
-                partial_stack = stack[-size:]
-                stack = stack[:-size]
-                states = states[:-size]
-                # s_prior = states.pop()
-                s_prior = states[-1]
-                s_next = self.table[s_prior][1][action.symbol]
-                stack.append((action, partial_stack))
-                states.append(s_next)
-        return stack[0]
+    def parse(
+        self,
+        toks: Iterator[Token],
+        tranx: bool = False,
+        errors: Optional[List[ParseError]] = None,
+    ):
+        """
+        :param tranx: run each rule's action when it is reduced and return the
+            semantic value, instead of the Node parse tree
+        :param errors: if given, recover from syntax errors and collect them here,
+            parts of the result that failed to parse are the ParseError itself
+        """
+        parser = Parser(self, tranx, errors)
+        feed = parser.feed
+        for tok in toks:
+            feed(tok)
+        return parser.finish()
+
+    async def parse_async(
+        self,
+        toks: AsyncIterable[Token],
+        tranx: bool = False,
+        errors: Optional[List[ParseError]] = None,
+    ):
+        parser = Parser(self, tranx, errors)
+        async for tok in toks:
+            parser.feed(tok)
+        return parser.finish()
+
+    def generate_module(self) -> str:
+        """
+        Source of a standalone parser module for these tables, see slang.slr_codegen.
+        """
+        from slang.slr_codegen import generate
+        return generate(self)
 
     def print_states(self):
         print_states(self.states)
@@ -478,10 +1402,14 @@ class Grammar(Generic[Token]):
         table = []
         for i in range(len(self.states)):
             (actions, gotos) = self.table[i]
+            # a compact table's default reduce fills the cells without an entry, marked rN.
+            default = self.table.default(i) if self.compact else None
             strs = []
             for t in ts:
                 if act := actions.get(t):
                     strs.append(F"r{act.rid}" if isinstance(act, Rule) else str(act))
+                elif default:
+                    strs.append(F"r{default.rid}.")
                 else:
                     strs.append("")
             for nt in nts:
@@ -508,31 +1436,253 @@ class Grammar(Generic[Token]):
             s = " ".join(F"{s:{w}}" for (s, w) in zip(row, widths))
             print(F"""{i:<5} {s}""")
 
+class Parser(Generic[Token]):
+    """
+    Resumable LR driver, tokens are pushed in one at a time with feed
+    and finish ends the input.
+    """
+    def __init__(
+        self,
+        grammar: Grammar[Token],
+        tranx: bool = False,
+        errors: Optional[List[ParseError]] = None,
+    ) -> None:
+        """
+        :param errors: if given, syntax errors are collected here and parsing
+            goes on in panic mode instead of raising, see _error
+        """
+        self.grammar = grammar
+        self.tranx = tranx
+        self.errors = errors
+        self.stack: List[Any] = []
+        self.states: List[int] = [0]
+        self.pos = 0  # tokens fed so far
+        self._resync = -1  # errors at this token are not reported again
+        self._resumed = (-1, 0)  # token and stack depth the last recovery resumed at
+        matcher = grammar.matcher
+        self._kind = matcher.token_kind if has_kinds(matcher) else (lambda tok: tok)
+        if grammar.compact:
+            self.feed = self._feed_compact
+
+    def feed(self, tok: Optional[Token]) -> None:
+        """
+        Run the reductions the token triggers and shift it, None is EOF.
+        """
+        self.pos += 1
+        key = None if tok is None else self._kind(tok)
+        stack = self.stack
+        states = self.states
+        errors = self.errors
+        dispatch = self.grammar.dispatch
+        gotos = self.grammar.gotos
+        while True:
+            state = states[-1]
+            if state == -1:
+                raise ParseError(self.pos - 1, tok, [])
+            action = dispatch[state].get(key)
+            if action is None:
+                if self._error(tok, key, state):
+                    continue
+                return
+            if action.__class__ is int:
+                # shift
+                stack.append(tok)
+                states.append(action)
+                return
+            # reduce, stacks are popped in place
+            size = len(action.pattern)
+            if size:
+                partial_stack = stack[-size:]
+                del stack[-size:]
+                del states[-size:]
+            else:
+                partial_stack = []
+            if self.tranx:
+                if errors and (err := _first_error(partial_stack)) is not None:
+                    stack.append(err)
+                else:
+                    stack.append(action.action(partial_stack))
+            else:
+                stack.append(Node(action, partial_stack))
+            states.append(gotos[states[-1]][action.symbol])
+
+    def _feed_compact(self, tok: Optional[Token]) -> None:
+        # feed over a CompactTable, same stacks and semantics
+        self.pos += 1
+        table = self.grammar.table
+        key = None if tok is None else self._kind(tok)
+        t = 0 if tok is None else self.grammar.terminal_of_kind.get(key, -1)
+        stack = self.stack
+        states = self.states
+        if t < 0:
+            self._error(tok, key, states[-1])
+            return
+        errors = self.errors
+        base = table.action_base
+        check = table.action_check
+        value = table.action_value
+        defaults = table.defaults
+        goto_base = table.goto_base
+        goto_value = table.goto_value
+        covers = table.covers
+        miss = -1  # first state defaulting on tok without covering it, where eager tables stop
+        while True:
+            state = states[-1]
+            if state == -1:
+                raise ParseError(self.pos - 1, tok, [])
+            idx = base[state] + t
+            if check[idx] == state:
+                code = value[idx]
+            else:
+                code = defaults[state]
+                if code and miss < 0 and not covers[state] >> t & 1:
+                    miss = state
+            if code > 0:
+                # shift
+                stack.append(tok)
+                states.append(code - 1)
+                return
+            if code == 0:
+                if self._error(tok, key, state, miss):
+                    continue
+                return
+            if code == -1:
+                stack.append(tok)
+                states.append(-1)
+                return
+            # reduce, gotos after a reduce always exist
+            r = -2 - code
+            size = table.rule_size[r]
+            if size:
+                partial_stack = stack[-size:]
+                del stack[-size:]
+                del states[-size:]
+            else:
+                partial_stack = []
+            rule = table.rules[r]
+            if self.tranx:
+                if errors and (err := _first_error(partial_stack)) is not None:
+                    stack.append(err)
+                else:
+                    stack.append(rule.action(partial_stack))
+            else:
+                stack.append(Node(rule, partial_stack))
+            states.append(goto_value[goto_base[states[-1]] + table.rule_lhs[r]])
+
+    def _acts_on(self, state: int, key: Hashable) -> bool:
+        if self.grammar.compact:
+            table = self.grammar.table
+            t = 0 if key is None else self.grammar.terminal_of_kind.get(key, -1)
+            if t < 0:
+                return False
+            idx = table.action_base[state] + t
+            return (table.action_value[idx] if table.action_check[idx] == state else table.defaults[state]) != 0
+        return self.grammar.dispatch[state].get(key) is not None
+
+    def _error(self, tok: Optional[Token], key: Hashable, state: int, miss: int = -1) -> bool:
+        """
+        Syntax error at tok in state, raised if there's no error list.
+
+        Panic mode otherwise (Dragon Book 4.8.3): pop to the topmost state with
+        a goto on some A whose target acts on tok, push A valued by the error
+        and retry tok (True), failing again on tok resumes deeper. Failing that
+        tok is discarded (False), and so are the errors of the following tokens
+        until one resumes. At EOF the parse gives up with None as result.
+        With a CompactTable, miss is the state an eager table would have
+        failed in, before default reductions, and expected is reported there.
+        """
+        pos = self.pos - 1
+        if self.errors is None or pos != self._resync:
+            if self.grammar.compact:
+                # as an eager table would, from before the default reductions
+                expected = self.grammar.table.expected(state if miss < 0 else miss)
+            else:
+                expected = self.grammar.table[state][0]
+            err = ParseError(pos, tok, sorted(expected))
+            if self.errors is None:
+                raise err
+            self.errors.append(err)
+        states = self.states
+        top = len(states) - 1
+        if self._resumed[0] == pos:
+            top = min(top, self._resumed[1] - 1)
+        for k in range(top, -1, -1):
+            if self.grammar.compact:
+                gotos = self.grammar.table[states[k]][1]
+            else:
+                gotos = self.grammar.gotos[states[k]]
+            for dst in gotos.values():
+                if self._acts_on(dst, key):
+                    del states[k + 1:]
+                    del self.stack[k:]
+                    self.stack.append(self.errors[-1])
+                    states.append(dst)
+                    self._resync = pos
+                    self._resumed = (pos, k)
+                    return True
+        if tok is None:
+            self.stack[:] = [None]
+            self.states[:] = [0, -1]
+            return False
+        self._resync = pos + 1
+        return False
+
+    def finish(self) -> Any:
+        self.feed(None)
+        return self.stack[0]
+
+def _first_error(values: List[Any]) -> Optional[ParseError]:
+    # a value built on a recovered error is that error, actions don't see it
+    for v in values:
+        if v.__class__ is ParseError:
+            return v
+    return None
+
 def grammar(
     rules: List[Tuple[NonTerminal, List[Symbol], Callable[[Any], Any]]],
     op_defs: List[Tuple[Association, List[Terminal]]],
     matcher: Matcher[Token],
+    cache_dir: Optional[str] = None,
+    mode: Construction = SLR,
+    glr: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
 ) -> Grammar:
-    return Grammar([Rule(i, *args) for (i, args) in enumerate(rules)], op_defs, matcher)
+    return Grammar(
+        [Rule(i, *args) for (i, args) in enumerate(rules)],
+        op_defs, matcher, cache_dir, mode, glr, compact, lazy,
+    )
 
 def print_parsed(res):
-    def _go(indent, res):
-        if isinstance(res, tuple):
-            (n, vs) = res
-            print(F"{indent}{n.symbol}")
-            for v in vs:
-                _go(indent + "  ", v)
+    stack = [("", res)]
+    while stack:
+        (indent, res) = stack.pop()
+        if res.__class__ is Node:
+            print(F"{indent}{res.rule.symbol}")
+            stack.extend((indent + "  ", v) for v in reversed(res.children))
         else:
             print(F"{indent}{res}")
 
-    _go("", res)
-
 def apply_tranx(res):
-    def go(res):
-        if isinstance(res, tuple):
-            (r, vs) = res
-            vs = [go(v) for v in vs]
-            return r.action(vs)
-        else:
-            return res
-    return go(res)
+    """
+    Run the actions of a parse tree bottom up, like parsing with tranx.
+    """
+    if res.__class__ is not Node:
+        return res
+    # nodes being evaluated with the values of their children so far
+    stack = [(res, [])]
+    while True:
+        (node, vals) = stack[-1]
+        if len(vals) < len(node.children):
+            child = node.children[len(vals)]
+            if child.__class__ is Node:
+                stack.append((child, []))
+            else:
+                vals.append(child)
+            continue
+        stack.pop()
+        if (v := _first_error(vals)) is None:
+            v = node.rule.action(vals)
+        if not stack:
+            return v
+        stack[-1][1].append(v)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Callable, Union, Tuple
+from operator import itemgetter
+from typing import Any, Callable, List, Optional, Union, Tuple
 from dataclasses import dataclass
 from .syntax import Arrow, Ty, Term, Lam, Unit, UnitTy, Var, App
 
@@ -124,13 +125,101 @@ def evaluate(t: Term, env: Env) -> Term:
     except StopEvalException:
         return t
 
+# closure compiling evaluator: a term is compiled once into Python closures
+# taking the environment, a tuple of values with the value of Var(i) at i,
+# values are Unit or CompiledClosure
+
+Code = Callable[[Tuple[Any, ...]], Any]
+
+class CompiledClosure(object):
+    __slots__ = ("lam", "body", "env")
+
+    def __init__(self, lam: Lam, body: Code, env: Tuple[Any, ...]) -> None:
+        self.lam = lam
+        self.body = body
+        self.env = env
+
+def compile_term(t: Term) -> Code:
+    """
+    Compiling doesn't recurse. Running the code does: it nests a Python call
+    per application nested in t and per pending call of the evaluation, and
+    readback recurses on the result's depth, so terms nested deeper than the
+    interpreter's recursion limit allows aren't supported. evaluate_vm runs
+    those.
+    """
+    codes: List[Code] = []
+    # terms with whether their parts are compiled, last first
+    work: List[Tuple[Term, bool]] = [(t, False)]
+    while work:
+        (t, built) = work.pop()
+        if isinstance(t, Var):
+            codes.append(itemgetter(t.i))
+        elif isinstance(t, Unit):
+            codes.append(_const(t))
+        elif not built and isinstance(t, Lam):
+            work += [(t, True), (t.term, False)]
+        elif not built and isinstance(t, App):
+            work += [(t, True), (t.arg, False), (t.f, False)]
+        elif isinstance(t, Lam):
+            codes.append(_lam(t, codes.pop()))
+        elif isinstance(t, App):
+            arg = codes.pop()
+            codes.append(_app(codes.pop(), arg))
+        else:
+            raise EvalException()
+    return codes[0]
+
+def _const(t: Term) -> Code:
+    return lambda env: t
+
+def _lam(t: Lam, body: Code) -> Code:
+    return lambda env: CompiledClosure(t, body, env)
+
+def _app(f: Code, arg: Code) -> Code:
+    def _run(env):
+        c = f(env)
+        v = arg(env)
+        if c.__class__ is not CompiledClosure:
+            raise EvalException(F"applying a non function: {c}")
+        return c.body((v,) + c.env)
+    return _run
+
+def readback(v: Any) -> Term:
+    """
+    The term of a value, closures have their environment substituted.
+    """
+    if v.__class__ is CompiledClosure:
+        return Lam(v.lam.var, v.lam.ty, _readback(v.lam.term, v.env, 1))
+    return v
+
+def _readback(t: Term, env: Tuple[Any, ...], depth: int, value: Callable[[Any], Term] = readback) -> Term:
+    # t under depth binders with the values of its free variables in env
+    if isinstance(t, Var):
+        return t if t.i < depth else value(env[t.i - depth])
+    elif isinstance(t, Lam):
+        return Lam(t.var, t.ty, _readback(t.term, env, depth + 1, value))
+    elif isinstance(t, App):
+        return App(_readback(t.f, env, depth, value), _readback(t.arg, env, depth, value))
+    else:
+        return t
+
+def evaluate_compiled(t: Term) -> Term:
+    """
+    evaluate for closed well typed terms, without substitution. Applying a
+    non function raises instead of stopping.
+    """
+    return readback(compile_term(t)(()))
+
 class Kont(object):
     pass
 
 class CEKVal(object):
     pass
 
-CEKEnv = Callable[[int], CEKVal]
+# persistent environments as cons cells (value of Var(0), rest), None when
+# empty: extending is O(1) and shares the captured environment, Var(i) is
+# found i cells down
+CEKEnv = Optional[Tuple[CEKVal, Any]]
 
 class Top(Kont):
     pass
@@ -157,15 +246,36 @@ class Atom(CEKVal):
     v: Term
 
 def extend(v: CEKVal, e: CEKEnv) -> CEKEnv:
-    def _go(i: int):
-        if i == 0:
-            return v
-        else:
-            return e(i - 1)
-    return _go
+    return (v, e)
+
+def lookup(e: CEKEnv, i: int) -> CEKVal:
+    while i:
+        e = e[1]
+        i -= 1
+    return e[0]
+
+EmptyCEKEnv: CEKEnv = None
 
-def EmptyCEKEnv(i: int) -> CEKVal:
-    raise EvalException()
+def _frames(k: Kont) -> Any:
+    # Kont chain to run's tuples
+    ks = []
+    while not isinstance(k, Top):
+        ks.append(k)
+        k = k.k
+    frames = None
+    for k in reversed(ks):
+        frames = (True, k.b, k.e, frames) if isinstance(k, Fun) else (False, k.t, k.e, frames)
+    return frames
+
+def _konts(frames: Any) -> Kont:
+    fs = []
+    while frames is not None:
+        fs.append(frames)
+        frames = frames[3]
+    k = Top()
+    for (is_fun, t, e, _) in reversed(fs):
+        k = Fun(t, e, k) if is_fun else Arg(t, e, k)
+    return k
 
 class CEK(object):
     c: Term
@@ -176,11 +286,13 @@ class CEK(object):
         self.c = c
         self.e = EmptyCEKEnv
         self.k = Top()
+        self.steps = 0
+        self.allocs = 0  # continuation frames, values and environments made
 
     def step(self):
         (c, e, k) = (self.c, self.e, self.k)
         if isinstance(c, Var):
-            v = e(c.i)
+            v = lookup(e, c.i)
             if isinstance(v, Closure):
                 self.c = v.f
                 self.e = v.e
@@ -189,10 +301,12 @@ class CEK(object):
         elif isinstance(c, App):
             self.c = c.f
             self.k = Arg(c.arg, e, k)
+            self.allocs += 1
         elif isinstance(c, Lam) and isinstance(k, Arg):
             self.c = k.t
             self.e = k.e
             self.k = Fun(c.term, e, k.k)
+            self.allocs += 1
         else:
             if isinstance(k, Top):
                 raise StopEvalException()
@@ -204,6 +318,61 @@ class CEK(object):
                     v = Atom(c)
                 self.e = extend(v, k.e)
                 self.k = k.k
+                self.allocs += 2
+            else:
+                # stuck, a non function applied
+                raise StopEvalException()
+        self.steps += 1
+
+    def run(self, max_steps: Optional[int] = None) -> Optional[Term]:
+        """
+        Step until the machine stops, the final control is returned, or for
+        at most max_steps, None then and the machine can run on. A stuck
+        machine raises StopEvalException like step. The same
+        transitions as step in one loop, continuations are kept as
+        (is Fun, term, env, next) tuples meanwhile, None for Top.
+        """
+        (c, e) = (self.c, self.e)
+        k = _frames(self.k)
+        (steps, allocs) = (0, 0)
+        limit = -1 if max_steps is None else max_steps
+        (done, stuck) = (False, False)
+        while steps != limit:
+            cls = c.__class__
+            if cls is Var:
+                (v, i) = (e, c.i)
+                while i:
+                    v = v[1]
+                    i -= 1
+                v = v[0]
+                if v.__class__ is Closure:
+                    (c, e) = (v.f, v.e)
+                elif v.__class__ is Atom:
+                    c = v.v
+            elif cls is App:
+                k = (False, c.arg, e, k)
+                c = c.f
+                allocs += 1
+            elif cls is Lam and k is not None and not k[0]:
+                (c, e, k) = (k[1], k[2], (True, c.term, e, k[3]))
+                allocs += 1
+            elif k is None:
+                done = True
+                break
+            elif k[0]:
+                e = ((Closure(c, e) if cls is Lam else Atom(c)), k[2])
+                (c, k) = (k[1], k[3])
+                allocs += 2
+            else:
+                stuck = True
+                break
+            steps += 1
+        (self.c, self.e, self.k) = (c, e, _konts(k))
+        self.steps += steps
+        self.allocs += allocs
+        if stuck:
+            raise StopEvalException()
+        return c if done else None
 
     # def __str__(self):
     #     c_str = str(self.c)
@@ -1,6 +1,9 @@
+from typing import Iterator, Optional
+
+from slang.scope import Scope
 from slang.slr import (
     EOF, Symbol, Terminal, NonTerminal,
-    grammar, RightAssoc
+    grammar, RightAssoc, SLR
 )
 from slang.stlc.syntax import Arrow, Unit, UnitTy
 from slang.stlc.lexer import ARROW, Token as STLC_Token
@@ -20,7 +23,11 @@ def pick(i):
         return p[i]
     return _pick_i
 
-def mk_grammar():
+def mk_grammar(cache_dir=None, mode=SLR, glr=False, compact=False, lazy=False, scope: Optional[Scope] = None):
+    """
+    :param scope: resolve variables in the actions against it, the parse
+        gives de Bruijn indexed terms like to_dbi, see DbiParser
+    """
     S  = NonTerminal("S")
     E  = NonTerminal("E")
     E1 = NonTerminal("E1")
@@ -53,6 +60,28 @@ def mk_grammar():
         (TY, [TLPAREN, TY, TRPAREN], pick(1)),
     ]
 
+    if scope is not None:
+        # the binder is reduced on the first token of its body
+        BIND = NonTerminal("BIND")
+
+        def bind(p):
+            scope.bind(p[1].name)
+            return (p[1].name, p[3])
+
+        def lam(p):
+            (name, ty) = p[0]
+            scope.unbind(name)
+            return Syn.Lam(name, ty, p[1])
+
+        def var(p):
+            if (i := scope.index(p[0].name)) < 0:
+                raise Exception(F"Unbound variable: {p[0].name}")
+            return Syn.Var(i)
+
+        rules[1] = (E, [BIND, E1], lam)
+        rules[5] = (E2, [TVAR], var)
+        rules.append((BIND, [TLAM, TVAR, TCOLON, TY, TDOT], bind))
+
     assoc_preceds = [
         (RightAssoc, [TARROW])
     ]
@@ -70,5 +99,35 @@ def mk_grammar():
                 or s == TARROW and t is ARROW
             )
 
-    g = grammar(rules, assoc_preceds, Matcher())
+        def token_kind(self, t: STLC_Token):
+            return VAR if isinstance(t, VAR) else t
+
+        def terminal_kind(self, s: Symbol):
+            return kinds[s]
+
+    kinds = {
+        TLAM: LAM,
+        TCOLON: COLON,
+        TDOT: DOT,
+        TLPAREN: LPAREN,
+        TRPAREN: RPAREN,
+        TVAR: VAR,
+        TUNIT: UNIT,
+        TARROW: ARROW,
+    }
+
+    g = grammar(rules, assoc_preceds, Matcher(), cache_dir, mode, glr, compact, lazy)
     return g
+
+class DbiParser(object):
+    """
+    Parses to de Bruijn indexed terms in one pass, see mk_grammar's scope.
+    """
+    def __init__(self, cache_dir=None, mode=SLR, compact=False, lazy=False) -> None:
+        self.scope = Scope()
+        self.grammar = mk_grammar(cache_dir, mode, compact=compact, lazy=lazy, scope=self.scope)
+
+    def parse(self, toks: Iterator[STLC_Token]) -> Syn.Term:
+        # a failed parse leaves binders behind
+        self.scope.reset()
+        return self.grammar.parse(toks, tranx=True)
@@ -1,6 +1,8 @@
 import re
 from typing import List
 
+from slang.lexer import Scanner, StreamScanner
+
 RE_LAM = re.compile(R"\\")
 RE_VAR = re.compile(R"[a-zA-Z]+")
 RE_DOT = re.compile(R"\.")
@@ -41,27 +43,33 @@ class VAR(Token):
         else:
             return False
 
-def lex(s: str) -> List[Token]:
-    tokens : List[Token] = []
-    r = None
-    while s != "":
-        defs = [
-            (RE_LAM, lambda toks, r: toks.append(LAM)),
-            (RE_VAR, lambda toks, r: toks.append(VAR(r.group()))),
-            (RE_DOT, lambda toks, r: toks.append(DOT)),
-            (RE_COLON, lambda toks, r: toks.append(COLON)),
-            (RE_LPAREN, lambda toks, r: toks.append(LPAREN)),
-            (RE_RPAREN, lambda toks, r: toks.append(RPAREN)),
-            (RE_UNIT, lambda toks, r: toks.append(UNIT)),
-            (RE_ARROW, lambda toks, r: toks.append(ARROW)),
-            (RE_BLANK, lambda toks, r: None),
-        ]
+LEX_DEF = [
+    (RE_LAM, lambda toks, r: toks.append(LAM)),
+    (RE_VAR, lambda toks, r: toks.append(VAR(r.group()))),
+    (RE_DOT, lambda toks, r: toks.append(DOT)),
+    (RE_COLON, lambda toks, r: toks.append(COLON)),
+    (RE_LPAREN, lambda toks, r: toks.append(LPAREN)),
+    (RE_RPAREN, lambda toks, r: toks.append(RPAREN)),
+    (RE_UNIT, lambda toks, r: toks.append(UNIT)),
+    (RE_ARROW, lambda toks, r: toks.append(ARROW)),
+    (RE_BLANK, lambda toks, r: None),
+]
+
+_SCANNER = Scanner(LEX_DEF)
+lex = _SCANNER.lex
+iter_lex = _SCANNER.iter_lex
+
+STREAM_DEF = [
+    (RE_LAM, LAM),
+    (RE_VAR, VAR),
+    (RE_DOT, DOT),
+    (RE_COLON, COLON),
+    (RE_LPAREN, LPAREN),
+    (RE_RPAREN, RPAREN),
+    (RE_UNIT, UNIT),
+    (RE_ARROW, ARROW),
+    (RE_BLANK, None),
+]
 
-        for (pat, proc) in defs:
-            if r := pat.match(s):
-                proc(tokens, r)
-                break
-        if not r:
-            break
-        s = s[r.end():]
-    return tokens
+_STREAM_SCANNER = StreamScanner(STREAM_DEF)
+scan = _STREAM_SCANNER.scan
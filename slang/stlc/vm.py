@@ -0,0 +1,138 @@
+from array import array
+from typing import Any, Dict, List, Tuple
+
+from .evaluate import EvalException, _readback
+from .syntax import App, Lam, Term, Unit, Var
+
+# instructions, opcodes followed by their operand if they take one
+ACCESS = 0       # n: push the value of Var(n)
+APPLY = 1        # pop the argument and the closure, call it
+TAILAPPLY = 2    # APPLY then RETURN, without growing the dump
+RETURN = 3       # back to the caller, the result stays on the stack
+CLOSURE = 4      # addr: push a closure of the body at addr over the environment
+UNIT = 5         # push unit
+STOP = 6         # the value on the stack is the result
+
+NAMES = ["ACCESS", "APPLY", "TAILAPPLY", "RETURN", "CLOSURE", "UNIT", "STOP"]
+OPERANDS = [1, 0, 0, 0, 1, 0, 0]
+
+_UNIT = Unit()
+
+class Program(object):
+    """
+    A term compiled for the VM, the entry is at 0 and lambda bodies follow,
+    lams maps each body's address to its lambda.
+    """
+    def __init__(self, code: array, lams: Dict[int, Lam]) -> None:
+        self.code = code
+        self.lams = lams
+
+def compile_program(t: Term) -> Program:
+    code = array("i")
+    lams: Dict[int, Lam] = {}
+    # (address of the CLOSURE operand, lambda) to compile after the entry
+    bodies: List[Tuple[int, Lam]] = []
+    # terms (with whether in tail position) and instructions to emit, last first
+    work: List[Any] = [STOP, (t, False)]
+    done = 0
+    while True:
+        while work:
+            item = work.pop()
+            if item.__class__ is int:
+                code.append(item)
+                continue
+            (t, tail) = item
+            if isinstance(t, App):
+                work += [TAILAPPLY if tail else APPLY, (t.arg, False), (t.f, False)]
+                continue
+            if isinstance(t, Var):
+                code.extend((ACCESS, t.i))
+            elif isinstance(t, Lam):
+                code.extend((CLOSURE, -1))
+                bodies.append((len(code) - 1, t))
+            elif isinstance(t, Unit):
+                code.append(UNIT)
+            else:
+                raise EvalException(F"Unknown term type: {type(t)}")
+            if tail:
+                code.append(RETURN)
+        if done == len(bodies):
+            return Program(code, lams)
+        (at, lam) = bodies[done]
+        done += 1
+        code[at] = len(code)
+        lams[len(code)] = lam
+        work.append((lam.term, True))
+
+def disassemble(prog: Program) -> str:
+    lines = []
+    code = prog.code
+    pc = 0
+    while pc < len(code):
+        if (lam := prog.lams.get(pc)) is not None:
+            lines.append(F"\\{lam.var}:")
+        op = code[pc]
+        if OPERANDS[op]:
+            lines.append(F"{pc:5}  {NAMES[op]:9} {code[pc + 1]}")
+        else:
+            lines.append(F"{pc:5}  {NAMES[op]}")
+        pc += 1 + OPERANDS[op]
+    return "\n".join(lines)
+
+def run(prog: Program) -> Any:
+    """
+    Runs prog to its value, unit or a closure (body address, environment).
+    Environments are cons cells like CEK's, the dump holds return addresses
+    with the caller's environment.
+    """
+    code = prog.code
+    pc = 0
+    env: Any = None
+    stack: List[Any] = []
+    dump: List[Tuple[int, Any]] = []
+    (push, pop) = (stack.append, stack.pop)
+    while True:
+        op = code[pc]
+        if op == ACCESS:
+            (e, i) = (env, code[pc + 1])
+            while i:
+                e = e[1]
+                i -= 1
+            push(e[0])
+            pc += 2
+        elif op == APPLY or op == TAILAPPLY:
+            v = pop()
+            c = pop()
+            if c.__class__ is not tuple:
+                raise EvalException(F"applying a non function: {c}")
+            if op == APPLY:
+                dump.append((pc + 1, env))
+            (pc, env) = (c[0], (v, c[1]))
+        elif op == RETURN:
+            (pc, env) = dump.pop()
+        elif op == CLOSURE:
+            push((code[pc + 1], env))
+            pc += 2
+        elif op == UNIT:
+            push(_UNIT)
+            pc += 1
+        else:
+            return pop()
+
+def readback(prog: Program, v: Any) -> Term:
+    if v.__class__ is tuple:
+        lam = prog.lams[v[0]]
+        env = []
+        e = v[1]
+        while e is not None:
+            env.append(e[0])
+            e = e[1]
+        return Lam(lam.var, lam.ty, _readback(lam.term, env, 1, lambda v: readback(prog, v)))
+    return v
+
+def evaluate_vm(t: Term) -> Term:
+    """
+    evaluate for closed well typed terms, compiled to instructions and run.
+    """
+    prog = compile_program(t)
+    return readback(prog, run(prog))
@@ -1,8 +1,11 @@
 # flake8: noqa E221,E241
 
 from dataclasses import dataclass
+from typing import Iterator, Optional
+
 from slang.nicetoken import Matcher, TerminalOfToken, Token
-from slang.slr import NonTerminal, EOF, grammar, RightAssoc
+from slang.scope import Scope
+from slang.slr import NonTerminal, EOF, grammar, RightAssoc, SLR
 
 # from . import lexer as Lex
 # from . import syntax as Syn
@@ -24,7 +27,11 @@ def const(v):
         return v
     return _const
 
-def mk_grammar():
+def mk_grammar(cache_dir=None, mode=SLR, glr=False, compact=False, lazy=False, scope: Optional[Scope] = None):
+    """
+    :param scope: resolve variables in the actions against it, the parse
+        gives de Bruijn indexed terms like to_dbi, see DbiParser
+    """
     NT = NonTerminal
     T = TerminalOfToken
     M = Matcher()
@@ -85,9 +92,61 @@ def mk_grammar():
             ([LPAREN, TY, RPAREN], lambda p: p[1]),
         ]),
     ]
+    if scope is not None:
+        # binder heads are reduced on the first token of their bodies,
+        # term and type variables share the scope as in to_dbi
+        BIND  = NT("BIND")
+        TBIND = NT("TBIND")
+
+        def bind(p):
+            scope.bind(p[1].s)
+            return p
+
+        def unbind(mk):
+            def _unbind(p):
+                scope.unbind(p[0][1].s)
+                return mk(p[0], p[1])
+            return _unbind
+
+        rules[1] = (E, [
+            ([BIND, E],  unbind(lambda b, e: Syn.Abs(b[1].s, b[3], e))),
+            ([TBIND, E], unbind(lambda b, e: Syn.TAbs(b[1].s, e))),
+            ([E1], pick(0)),
+        ])
+        rules[3] = (ES, [
+            ([IDENT], lambda p: Syn.VarI(scope.index(p[0].s))),
+            ([UNIT], const(u)),
+            ([LPAREN, E, RPAREN], lambda p: p[1]),
+        ])
+        rules[4] = (TY, [
+            ([TY1], pick(0)),
+            ([TBIND, TY1], unbind(lambda b, t: Syn.Forall(b[1].s, t))),
+        ])
+        rules[6] = (TYS, [
+            ([UNIT], const(U)),
+            ([IDENT], lambda p: Syn.TVarI(scope.index(p[0].s))),
+            ([LPAREN, TY, RPAREN], lambda p: p[1]),
+        ])
+        rules += [
+            (BIND,  [ ([LAMBDA, IDENT, COLON, TY, DOT], bind) ]),
+            (TBIND, [ ([FORALL, IDENT, DOT], bind) ]),
+        ]
     rules = [(NT, sub[0], sub[1]) for (NT, subs) in rules for sub in subs]
     assoc_preceds = [
         (RightAssoc, [ARROW]),
     ]
-    g = grammar(rules, assoc_preceds, M)
+    g = grammar(rules, assoc_preceds, M, cache_dir, mode, glr, compact, lazy)
     return g
+
+class DbiParser(object):
+    """
+    Parses to de Bruijn indexed terms in one pass, see mk_grammar's scope.
+    """
+    def __init__(self, cache_dir=None, mode=SLR, compact=False, lazy=False) -> None:
+        self.scope = Scope()
+        self.grammar = mk_grammar(cache_dir, mode, compact=compact, lazy=lazy, scope=self.scope)
+
+    def parse(self, toks: Iterator[Token]) -> Syn.Term:
+        # a failed parse leaves binders behind
+        self.scope.reset()
+        return self.grammar.parse(toks, tranx=True)
@@ -1,8 +1,5 @@
-import re
-
-from functools import partial
 from dataclasses import dataclass
-from slang.lexer import lex as _lex
+from slang.lexer import Scanner, StreamScanner
 from slang.nicetoken import Token
 
 @dataclass
@@ -44,4 +41,25 @@ LEX_DEF = [
     (r"[a-zA-Z]+", lambda o, r:  o.append(IDENT(r.group()))),
 ]
 
-lex = partial(_lex, [(re.compile(p), f) for (p, f) in LEX_DEF])
+_SCANNER = Scanner(LEX_DEF)
+lex = _SCANNER.lex
+iter_lex = _SCANNER.iter_lex
+
+# punctuation tokens shared by all matches
+STREAM_DEF = [
+    (r"\s+",       None      ),
+    (r"/",         LAMBDA()  ),
+    (r"@",         FORALL()  ),
+    (r"\.",        DOT()     ),
+    (r":",         COLON()   ),
+    (r"->",        ARROW()   ),
+    (r"\(",        LPAREN()  ),
+    (r"\)",        RPAREN()  ),
+    (r"\[",        LSQPAREN()),
+    (r"\]",        RSQPAREN()),
+    (r"0",         UNIT()    ),
+    (r"[a-zA-Z]+", IDENT     ),
+]
+
+_STREAM_SCANNER = StreamScanner(STREAM_DEF)
+scan = _STREAM_SCANNER.scan
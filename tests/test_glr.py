@@ -0,0 +1,93 @@
+from unittest.case import TestCase
+
+from slang import glr
+from slang.slr import EOF, LALR, NonTerminal, Terminal, grammar
+from slang.slr_impl import apply_tranx
+from slang.stlc.grammar import mk_grammar
+from slang.stlc.lexer import lex
+from tests.test_slr import NameMatcher, lr1_rules
+
+E = NonTerminal("E")
+S = NonTerminal("S")
+PLUS = Terminal("+")
+N = Terminal("n")
+
+def ambiguous_rules():
+    return [
+        (S, [E, EOF], lambda p: p[0]),
+        (E, [E, PLUS, E], lambda p: (p[0], p[2])),
+        (E, [N], lambda p: p[0]),
+    ]
+
+class TestGLR(TestCase):
+    def test_conflict_raises(self):
+        with self.assertRaises(Exception):
+            grammar(ambiguous_rules(), [], NameMatcher())
+
+    def test_ambiguous(self):
+        g = grammar(ambiguous_rules(), [], NameMatcher(), glr=True)
+        assert g.conflicts
+        res = glr.parse(g, iter("n+n+n"))
+        assert res.is_ambiguous()
+        assert glr.count_trees(res) == 2
+        trees = {apply_tranx(t) for t in glr.forest_trees(res)}
+        assert trees == {(("n", "n"), "n"), ("n", ("n", "n"))}
+
+    def test_catalan(self):
+        g = grammar(ambiguous_rules(), [], NameMatcher(), glr=True)
+        counts = [glr.count_trees(glr.parse(g, iter("+".join("n" * i)))) for i in range(1, 9)]
+        assert counts == [1, 1, 2, 5, 14, 42, 132, 429]
+
+    def test_reduce_reduce(self):
+        with self.assertRaises(Exception):
+            grammar(lr1_rules(), [], NameMatcher(), mode=LALR)
+        g = grammar(lr1_rules(), [], NameMatcher(), mode=LALR, glr=True)
+        for (toks, res) in [("axc", "E"), ("axd", "F"), ("bxc", "F"), ("bxd", "E")]:
+            assert [apply_tranx(t) for t in glr.forest_trees(glr.parse(g, iter(toks)))] == [res]
+
+    def test_epsilon(self):
+        A = NonTerminal("A")
+        g = grammar([
+            (S, [E, EOF], lambda p: p[0]),
+            (E, [A, A, N, A], lambda p: (p[0], p[1], p[3])),
+            (A, [], lambda p: None),
+            (A, [PLUS], lambda p: p[0]),
+        ], [], NameMatcher(), glr=True)
+        trees = lambda toks: {apply_tranx(t) for t in glr.forest_trees(glr.parse(g, iter(toks)))}
+        assert trees("n") == {(None, None, None)}
+        assert trees("n+") == {(None, None, "+")}
+        assert trees("+n") == {("+", None, None), (None, "+", None)}
+        assert trees("++n+") == {("+", "+", "+")}
+
+    def test_cyclic(self):
+        (N0, N1, T0) = (NonTerminal("N0"), NonTerminal("N1"), Terminal("t0"))
+        cyclic = [
+            (S, [N0, EOF], lambda p: p[0]),
+            (N0, [], lambda p: None),
+            (N0, [N1], lambda p: p[0]),
+            (N0, [N0, N0, N0], lambda p: p),
+            (N1, [N1, N1], lambda p: p),
+            (N1, [N1, N0], lambda p: p),
+            (N1, [T0], lambda p: p[0]),
+        ]
+        with self.assertRaisesRegex(Exception, "derives itself"):
+            grammar(cyclic, [], NameMatcher(), glr=True)
+        with self.assertRaisesRegex(Exception, "derives itself"):
+            grammar([(S, [E, EOF], lambda p: p[0]), (E, [NonTerminal("N")], lambda p: p[0]),
+                     (NonTerminal("N"), [E], lambda p: p[0]), (E, [N], lambda p: p[0])], [], NameMatcher(), glr=True)
+        # nullable but no cycle: N0 := N0 N0 N0 needs a token
+        g = grammar(cyclic[:3] + [(N0, [N0, T0, N0], lambda p: p), cyclic[-1]], [], NameMatcher(), glr=True)
+        assert glr.count_trees(glr.parse(g, iter(["t0"] * 3))) > 1
+
+    def test_parse_error(self):
+        g = grammar(ambiguous_rules(), [], NameMatcher(), glr=True)
+        with self.assertRaises(Exception):
+            glr.parse(g, iter("n++n"))
+
+    def test_deterministic(self):
+        g = mk_grammar()
+        g_glr = mk_grammar(glr=True)
+        toks = lex("(\\x:0->0.x 0)(\\x:0.x)")
+        trees = list(glr.forest_trees(glr.parse(g_glr, iter(toks))))
+        assert len(trees) == 1
+        assert apply_tranx(trees[0]) == g.parse(iter(toks), tranx=True)
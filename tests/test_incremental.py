@@ -0,0 +1,113 @@
+import random
+from unittest.case import TestCase
+
+from slang.incremental import IncrementalParse
+from slang.slr import ParseError
+from slang.stlc import grammar as stlc_grammar, lexer as stlc_lexer
+from slang.sysf import grammar as sysf_grammar, lexer as sysf_lexer
+
+SYSF_SOURCE = "(/id:@T.T->T.id[0]0)(@T./x:T.x)" + " (@T./x:T.x)[0]0" * 40
+
+class TestRescan(TestCase):
+    def test_random_edits(self):
+        scanner = sysf_lexer._STREAM_SCANNER
+        rnd = random.Random(0)
+        pieces = ["ab", " ", "/", "@", ".", ":", "->", "-", "(", ")", "0", "T", "  "]
+        src = SYSF_SOURCE
+        stream = scanner.scan(src)
+        for _ in range(500):
+            a = rnd.randrange(len(src) + 1)
+            b = min(len(src), a + rnd.randrange(4))
+            text = "".join(rnd.choice(pieces) for _ in range(rnd.randrange(3)))
+            kinds = list(stream.kinds)
+            (k, j) = scanner.rescan(stream, a, b, text)
+            src = src[:a] + text + src[b:]
+            expected = scanner.scan(src)
+            assert stream.source == src
+            assert (list(stream.kinds), list(stream.starts), list(stream.ends)) == (
+                list(expected.kinds), list(expected.starts), list(expected.ends))
+            assert list(stream) == list(expected)
+            assert kinds[:k] == list(expected.kinds[:k])
+            assert kinds[j:] == list(expected.kinds[len(expected) - len(kinds) + j:])
+
+    def test_kept(self):
+        scanner = sysf_lexer._STREAM_SCANNER
+        stream = scanner.scan("ab cd ef")
+        ef = stream[2]
+        assert scanner.rescan(stream, 3, 5, "xyz") == (1, 2)
+        assert [stream.text(i) for i in range(len(stream))] == ["ab", "xyz", "ef"]
+        assert stream[2] is ef
+
+class TestIncrementalParse(TestCase):
+    def test_edits(self):
+        g = sysf_grammar.mk_grammar()
+        inc = IncrementalParse(g, sysf_lexer._STREAM_SCANNER, SYSF_SOURCE, tranx=True, interval=8)
+        parse = lambda s: g.parse(iter(sysf_lexer.lex(s)), tranx=True)
+        assert inc.result == parse(SYSF_SOURCE)
+        n = len(inc.stream)
+        # rename the last bound variable
+        i = SYSF_SOURCE.rindex("x:T.x")
+        assert inc.edit(i, i + 5, "yy:T.yy") == parse(inc.source)
+        assert inc.reparsed < 16
+        # the stacks after the first snapshot hold only tokens, same as before
+        assert inc.edit(0, 0, "  ") == parse(inc.source)
+        assert inc.reparsed == 8
+        # the values differ from there on
+        j = inc.source.index("id")
+        assert inc.edit(j, j + 2, "idd") == parse(inc.source)
+        assert inc.reparsed == n
+        assert inc.source == "  (/idd" + SYSF_SOURCE[4:i] + "yy:T.yy" + SYSF_SOURCE[i + 5:]
+
+    def test_reuse_trees(self):
+        g = stlc_grammar.mk_grammar()
+        src = " ".join(["(\\x:0->0.x 0)"] * 200)
+        inc = IncrementalParse(g, stlc_lexer._STREAM_SCANNER, src, interval=8)
+        parse = lambda s: repr(g.parse(iter(stlc_lexer.lex(s))))
+        i = len(src) // 2
+        i = src.index("x", i)
+        (first, first_repr) = (inc.result, repr(inc.result))
+        inc.edit(i, i + 1, "yy")
+        # results returned before stay as they were
+        assert inc.result is not first and repr(first) == first_repr
+        inc.edit(src.index("x 0", i) + 1, src.index("x 0", i) + 2, "yy")
+        assert repr(inc.result) == parse(inc.source)
+        assert inc.reparsed < 24
+        rnd = random.Random(0)
+        pieces = ["x", "y", " ", "(", ")", "0", "\\x:0.", "->"]
+        for _ in range(300):
+            src = inc.source
+            a = rnd.randrange(len(src) + 1)
+            b = min(len(src), a + rnd.randrange(3))
+            text = "".join(rnd.choice(pieces) for _ in range(rnd.randrange(3)))
+            try:
+                expected = parse(src[:a] + text + src[b:])
+            except ParseError:
+                with self.assertRaises(ParseError):
+                    inc.edit(a, b, text)
+                continue
+            (old, old_repr) = (inc.result, repr(inc.result))
+            assert repr(inc.edit(a, b, text)) == expected
+            assert repr(old) == old_repr
+
+    def test_error_then_fix(self):
+        g = stlc_grammar.mk_grammar()
+        src = " ".join(["(\\x:0->0.x 0)"] * 20)
+        inc = IncrementalParse(g, stlc_lexer._STREAM_SCANNER, src, interval=4)
+        with self.assertRaises(ParseError):
+            inc.edit(50, 51, ")")
+        assert inc.source == src[:50] + ")" + src[51:]
+        inc.edit(50, 51, src[50])
+        assert repr(inc.result) == repr(g.parse(iter(stlc_lexer.lex(src))))
+
+    def test_errors(self):
+        g = sysf_grammar.mk_grammar()
+        errors = []
+        inc = IncrementalParse(g, sysf_lexer._STREAM_SCANNER, SYSF_SOURCE, tranx=True, errors=errors, interval=8)
+        i = SYSF_SOURCE.rindex("[0]")
+        inc.edit(i, i + 1, "(")
+        expected = []
+        g.parse(iter(sysf_lexer.lex(inc.source)), tranx=True, errors=expected)
+        assert [e.pos for e in errors] == [e.pos for e in expected] != []
+        inc.edit(i, i + 1, "[")
+        assert errors == []
+        assert inc.result == g.parse(iter(sysf_lexer.lex(SYSF_SOURCE)), tranx=True)
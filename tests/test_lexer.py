@@ -0,0 +1,116 @@
+import io
+import mmap
+import re
+import tempfile
+from unittest.case import TestCase
+
+from slang.lexer import Scanner, StreamMatcher, StreamScanner, lex
+from slang.slr import EOF, NonTerminal, Terminal, grammar
+
+def word_def():
+    return [
+        (re.compile(r"\s+"), lambda o, _: None),
+        (r"if", lambda o, _: o.append("IF")),
+        (r"[a-z]+", lambda o, r: o.append(("ID", r.group()))),
+        (re.compile(r"x(\d+)", re.I), lambda o, r: o.append(("X", r.group()))),
+    ]
+
+class TestScanner(TestCase):
+    def test_first_wins(self):
+        # in order like the sequential scan, not the longest match
+        assert lex(word_def(), "if iffy") == ["IF", "IF", ("ID", "fy")]
+
+    def test_flags(self):
+        assert Scanner(word_def()).lex("X12 X3") == [("X", "X12"), ("X", "X3")]
+        # re.A stays scoped to its pattern, re.L can't be
+        ascii_word = [(re.compile(r"\w+", re.A), lambda o, r: o.append(r.group())), (r".", lambda o, r: None)]
+        assert Scanner(ascii_word).lex("ab\u00e9c") == ["ab", "c"]
+        with self.assertRaises(ValueError):
+            Scanner([(re.compile(rb"\w", re.L), lambda o, r: None)])
+
+    def test_stops(self):
+        assert lex(word_def(), "ab ? cd") == [("ID", "ab")]
+        assert lex(word_def(), "") == []
+
+    def test_long(self):
+        s = "ab " * 200000
+        assert Scanner(word_def()).lex(s) == [("ID", "ab")] * 200000
+
+class TestIterLex(TestCase):
+    def test_chunks(self):
+        # tokens straddling chunk boundaries, multi-byte characters split
+        from slang.stlc import lexer
+        s = "(\\x:0->0.x) (\\yé:0->0->0.yé)" * 20
+        defs = [(re.compile(p), f) for (p, f) in lexer.LEX_DEF] + [(r"é", lambda o, _: o.append("E"))]
+        expected = lex(defs, s)
+        for size in (1, 2, 3, 7, 64, 1 << 16):
+            assert list(Scanner(defs).iter_lex(s, size, lookahead=4)) == expected
+            assert list(Scanner(defs).iter_lex(io.StringIO(s), size, lookahead=4)) == expected
+            assert list(Scanner(defs).iter_lex(io.BytesIO(s.encode()), size, lookahead=4)) == expected
+
+    def test_mmap(self):
+        s = "ab if cd " * 50000
+        with tempfile.TemporaryFile() as f:
+            f.write(s.encode())
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                assert list(Scanner(word_def()).iter_lex(m, 4096)) == lex(word_def(), s)
+
+    def test_lazy(self):
+        reads = []
+
+        class Source(object):
+            def read(self, n):
+                reads.append(n)
+                return "ab " * 100 if len(reads) < 1000 else ""
+
+        toks = Scanner(word_def()).iter_lex(Source(), 300, lookahead=8)
+        assert next(toks) == ("ID", "ab")
+        assert len(reads) == 1
+        assert sum(1 for _ in toks) == 999 * 100 - 1
+
+    def test_stops(self):
+        assert list(Scanner(word_def()).iter_lex("ab ? cd", 2, lookahead=2)) == [("ID", "ab")]
+        assert list(Scanner(word_def()).iter_lex(io.BytesIO(b""))) == []
+
+    def test_parse(self):
+        from slang.sysf import grammar, lexer
+        g = grammar.mk_grammar()
+        s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)" + " (@T./x:T.x)[0]0" * 50
+        assert g.parse(lexer.iter_lex(io.BytesIO(s.encode()), 16), tranx=True) == g.parse(iter(lexer.lex(s)), tranx=True)
+
+class Num(object):
+    def __init__(self, text):
+        self.n = int(text)
+
+PLUS = object()
+
+class TestTokenStream(TestCase):
+    def test_same_tokens(self):
+        from slang.stlc import lexer as stlc_lexer
+        from slang.sysf import lexer as sysf_lexer
+        s = "(\\x:0->0.x) (\\y:0->0->0.y)" * 20
+        assert list(stlc_lexer.scan(s)) == stlc_lexer.lex(s)
+        s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)" * 20
+        assert list(sysf_lexer.scan(s)) == sysf_lexer.lex(s)
+        assert list(sysf_lexer.scan("ab ? cd")) == sysf_lexer.lex("ab ? cd")
+
+    def test_shared(self):
+        scanner = StreamScanner([(r"\s+", None), (r"\+", PLUS), (r"[0-9]+", Num)])
+        stream = scanner.scan("1 + 22 + 1")
+        assert list(stream.kinds) == [2, 1, 2, 1, 2]
+        assert [stream.text(i) for i in range(len(stream))] == ["1", "+", "22", "+", "1"]
+        assert (list(stream.starts), list(stream.ends)) == ([0, 2, 4, 7, 9], [1, 3, 6, 8, 10])
+        assert [t.n for t in stream.value_tokens] == [1, 22]
+        assert stream[0] is stream[4] and stream[1] is PLUS
+        assert stream.nbytes() == 5 * (2 + 4 + 4 + 4)
+
+    def test_matcher(self):
+        scanner = StreamScanner([(r"\s+", None), (r"\+", PLUS), (r"[0-9]+", Num)])
+        (S, E, P, N) = (NonTerminal("S"), NonTerminal("E"), Terminal("+"), Terminal("n"))
+        g = grammar([
+            (S, [E, EOF], lambda p: p[0]),
+            (E, [E, P, N], lambda p: p[0] + p[2].n),
+            (E, [N], lambda p: p[0].n),
+        ], [], StreamMatcher(scanner, {P: 1, N: 2}))
+        assert g.parse(iter(scanner.scan("1 + 22 + 1")), tranx=True) == 24
@@ -1,6 +1,17 @@
-from slang.slr_impl import apply_tranx
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 from unittest.case import TestCase
-from slang.slr import Symbol, grammar, EOF, Terminal, NonTerminal, print_parsed
+from slang.slr_impl import (
+    CompactTable, Grammar, ItemTable, LR1States, Node, Rule, SymbolTable, apply_tranx,
+    _compute_occurrences, _compute_nullable, _compute_firsts, _compute_follows,
+)
+from slang import slr_impl
+from slang.slr import LeftAssoc, Symbol, Parser, ParseError, grammar, EOF, Terminal, NonTerminal, print_parsed, SLR, LALR, LR1
 
 G = NonTerminal("G")
 S = NonTerminal("S")
@@ -40,3 +51,554 @@ class TestGrammar(TestCase):
         res = g.parse(iter(arith))
         # print_parsed(res)
         assert apply_tranx(res) == ("+", 34, ("x", 12, ("+", 88, 1)))
+
+class ArithKindMatcher(ArithMatcher):
+    kinds = {PLUS: "+", MUL: "x", LPAREN: "(", RPAREN: ")", VAL: "val"}
+
+    def token_kind(self, tok: str):
+        return "val" if tok.isdigit() else tok
+
+    def terminal_kind(self, sym: Symbol):
+        return self.kinds[sym]
+
+def arith_rules():
+    return [
+        (G, [S, EOF], lambda p: p[0]),
+        (S, [S, PLUS, P], lambda p: ("+", p[0], p[2])),
+        (S, [P], lambda p: p[0]),
+        (P, [P, MUL, V], lambda p: ("x", p[0], p[2])),
+        (P, [V], lambda p: p[0]),
+        (V, [LPAREN, S, RPAREN], lambda p: p[1]),
+        (V, [VAL], lambda p: int(p[0])),
+    ]
+
+ARITH = ["34", "+", "(", "12", "x", "(", "88", "+", "1", ")", ")"]
+
+class TestKindDispatch(TestCase):
+    def test_same_result(self):
+        g_scan = grammar(arith_rules(), [], ArithMatcher())
+        g_kind = grammar(arith_rules(), [], ArithKindMatcher())
+        assert apply_tranx(g_kind.parse(iter(ARITH))) == apply_tranx(g_scan.parse(iter(ARITH)))
+
+    def test_parse_error(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        with self.assertRaises(Exception):
+            g.parse(iter(["1", "+", "+"]))
+        with self.assertRaises(Exception):
+            g.parse(iter(["1", "?"]))
+
+    def test_shared_kind(self):
+        class SharedKindMatcher(ArithKindMatcher):
+            kinds = {**ArithKindMatcher.kinds, MUL: "+"}
+        with self.assertRaises(Exception):
+            grammar(arith_rules(), [], SharedKindMatcher())
+
+class TestTableCache(TestCase):
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(arith_rules(), [], ArithKindMatcher(), d)
+            assert os.listdir(d) == [F"{g1.fingerprint}.json"]
+            with mock.patch.object(Grammar, "_build", side_effect=AssertionError("rebuilt")):
+                g2 = grammar(arith_rules(), [], ArithKindMatcher(), d)
+            assert g2.table == g1.table
+            assert g2.states == g1.states
+            assert apply_tranx(g2.parse(iter(ARITH))) == ("+", 34, ("x", 12, ("+", 88, 1)))
+
+    def test_fingerprint(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(arith_rules(), [], ArithKindMatcher(), d)
+            g2 = grammar(arith_rules()[:-1] + [(V, [PLUS, VAL], lambda p: int(p[1]))], [], ArithKindMatcher(), d)
+            assert g1.fingerprint != g2.fingerprint
+            assert len(os.listdir(d)) == 2
+
+    def test_corrupted(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(arith_rules(), [], ArithKindMatcher(), d)
+            with open(os.path.join(d, F"{g1.fingerprint}.json"), "w") as f:
+                f.write("{")
+            g2 = grammar(arith_rules(), [], ArithKindMatcher(), d)
+            assert g2.table == g1.table
+
+def states_str(g) -> str:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        g.print_states()
+    return out.getvalue()
+
+class NameMatcher(object):
+    # tokens are the terminal names
+    def match(self, sym: Symbol, tok: str):
+        return sym.s == tok
+
+    def token_kind(self, tok: str):
+        return tok
+
+    def terminal_kind(self, sym: Symbol):
+        return sym.s
+
+def assign_rules():
+    # LALR(1) but not SLR(1)
+    (S, L, R) = (NonTerminal("S"), NonTerminal("L"), NonTerminal("R"))
+    (EQ, STAR, ID) = (Terminal("="), Terminal("*"), Terminal("id"))
+    return [
+        (G, [S, EOF], lambda p: p[0]),
+        (S, [L, EQ, R], lambda p: ("=", p[0], p[2])),
+        (S, [R], lambda p: p[0]),
+        (L, [STAR, R], lambda p: ("*", p[1])),
+        (L, [ID], lambda p: p[0]),
+        (R, [L], lambda p: p[0]),
+    ]
+
+def lr1_rules():
+    # LR(1) but not LALR(1)
+    (S, E, F) = (NonTerminal("S"), NonTerminal("E"), NonTerminal("F"))
+    (A, B, C, D, X) = (Terminal("a"), Terminal("b"), Terminal("c"), Terminal("d"), Terminal("x"))
+    return [
+        (G, [S, EOF], lambda p: p[0]),
+        (S, [A, E, C], lambda p: p[1]),
+        (S, [A, F, D], lambda p: p[1]),
+        (S, [B, F, C], lambda p: p[1]),
+        (S, [B, E, D], lambda p: p[1]),
+        (E, [X], lambda p: "E"),
+        (F, [X], lambda p: "F"),
+    ]
+
+class TestConstruction(TestCase):
+    def test_modes_agree(self):
+        results = [
+            apply_tranx(grammar(arith_rules(), [], ArithKindMatcher(), mode=mode).parse(iter(ARITH)))
+            for mode in (SLR, LALR, LR1)
+        ]
+        assert results == [("+", 34, ("x", 12, ("+", 88, 1)))] * 3
+
+    def test_lalr(self):
+        g = grammar(assign_rules(), [], NameMatcher(), mode=LALR)
+        # LALR keeps the LR(0) automaton
+        assert not isinstance(g.states, LR1States)
+        assert len(g.states) < len(grammar(assign_rules(), [], NameMatcher(), mode=LR1).states)
+        res = apply_tranx(g.parse(iter(["*", "id", "=", "*", "*", "id"])))
+        assert res == ("=", ("*", "id"), ("*", ("*", "id")))
+
+    def test_lr1(self):
+        g = grammar(lr1_rules(), [], NameMatcher(), mode=LR1)
+        with self.assertRaises(Exception):
+            grammar(lr1_rules(), [], NameMatcher(), mode=LALR)
+        assert len(g.states) > len(grammar(lr1_rules(), [], NameMatcher(), mode=LALR, glr=True).states)
+        for (toks, res) in [("axc", "E"), ("axd", "F"), ("bxc", "F"), ("bxd", "E")]:
+            assert apply_tranx(g.parse(iter(toks))) == res
+        assert len(g.states) == 15
+        # x after a and after b, the reductions on c and d swap
+        out = states_str(g)
+        assert "STATE[7]\n  E := x! , c\n  F := x! , d\n" in out
+        assert "STATE[10]\n  E := x! , d\n  F := x! , c\n" in out
+
+    def test_lr1_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            g2 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            assert g1.fingerprint != grammar(lr1_rules(), [], NameMatcher(), mode=LALR, glr=True).fingerprint
+            assert g1.states == g2.states
+            assert g1.table == g2.table
+            assert states_str(g1) == states_str(g2)
+
+    def test_cache_lazy_states(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            with mock.patch.object(slr_impl, "ItemTable", side_effect=AssertionError):
+                g2 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+                assert apply_tranx(g2.parse(iter("axc"))) == "E"
+            assert g1.states == g2.states
+
+    def test_stale_cache_states(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            cache_file = os.path.join(d, F"{g1.fingerprint}.json")
+            with open(cache_file) as f:
+                data = json.load(f)
+            # a consistent dump with a state too many, as from another build
+            data["states"].append(data["states"][-1])
+            data["table"].append([[], []])
+            with open(cache_file, "w") as f:
+                json.dump(data, f)
+            g2 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            with self.assertRaisesRegex(Exception, "cached table"):
+                g2.states
+
+    def test_corrupted_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+            cache_file = os.path.join(d, F"{g1.fingerprint}.json")
+            with open(cache_file) as f:
+                data = json.load(f)
+            for corrupt in [
+                lambda data: data["table"].__setitem__(0, 7),  # wrong-typed row
+                lambda data: data["table"].__setitem__(0, data["table"][0][:1]),  # truncated row
+                lambda data: data["table"].pop(),  # truncated table
+                lambda data: data["table"][0][1][0].__setitem__(1, "1"),  # wrong-typed goto
+                lambda data: data["table"][0][1][0].__setitem__(1, 999),  # goto out of range
+                lambda data: data["conflicts"].append([0, 999, []]),  # unknown symbol
+            ]:
+                bad = json.loads(json.dumps(data))
+                corrupt(bad)
+                with open(cache_file, "w") as f:
+                    json.dump(bad, f)
+                g2 = grammar(lr1_rules(), [], NameMatcher(), d, LR1)
+                assert g2.table == g1.table
+                for (toks, res) in [("axc", "E"), ("bxc", "F")]:
+                    assert apply_tranx(g2.parse(iter(toks))) == res
+
+class TestTranx(TestCase):
+    def test_tranx(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        assert g.parse(iter(ARITH), tranx=True) == apply_tranx(g.parse(iter(ARITH)))
+
+    def test_deep(self):
+        # left recursion nests the tree as deep as the input is long
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        toks = ["1"] + ["+", "1"] * 5000
+        res = g.parse(iter(toks), tranx=True)
+        assert res[0] == "+" and res[2] == 1
+
+class TestParser(TestCase):
+    def test_feed(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        p = Parser(g, tranx=True)
+        for tok in ARITH:
+            p.feed(tok)
+        assert p.finish() == g.parse(iter(ARITH), tranx=True)
+
+    def test_feed_error(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        p = Parser(g)
+        p.feed("1")
+        p.feed("+")
+        with self.assertRaises(Exception):
+            p.feed(")")
+
+    def test_parse_async(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+
+        async def toks():
+            for tok in ARITH:
+                await asyncio.sleep(0)
+                yield tok
+
+        res = asyncio.run(g.parse_async(toks(), tranx=True))
+        assert res == ("+", 34, ("x", 12, ("+", 88, 1)))
+
+    def test_conflicts_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = grammar(lr1_rules(), [], NameMatcher(), d, LALR, glr=True)
+            g2 = grammar(lr1_rules(), [], NameMatcher(), d, LALR, glr=True)
+            assert g1.conflicts
+            assert g1.conflicts == g2.conflicts
+
+def ll_rules():
+    # Dragon Book 4.28, epsilon rules and right recursion
+    (E, E_, T, T_, F) = (NonTerminal("E"), NonTerminal("E'"), NonTerminal("T"), NonTerminal("T'"), NonTerminal("F"))
+    (ADD, MUL, LP, RP, ID) = (Terminal("+"), Terminal("*"), Terminal("("), Terminal(")"), Terminal("id"))
+    fold = lambda p: p[1](p[0]) if p[1] else p[0]
+    return [
+        (G, [E, EOF], lambda p: p[0]),
+        (E, [T, E_], fold),
+        (E_, [ADD, T, E_], lambda p: lambda l: ("+", l, fold([p[1], p[2]]))),
+        (E_, [], lambda p: None),
+        (T, [F, T_], fold),
+        (T_, [MUL, F, T_], lambda p: lambda l: ("*", l, fold([p[1], p[2]]))),
+        (T_, [], lambda p: None),
+        (F, [LP, E, RP], lambda p: p[1]),
+        (F, [ID], lambda p: p[0]),
+    ]
+
+class TestFirstFollow(TestCase):
+    def test_epsilon(self):
+        rules = [Rule(i, *r) for (i, r) in enumerate(ll_rules())]
+        items = ItemTable(rules)
+        symtab = items.symtab
+        occurrences = _compute_occurrences(items)
+        nullable = _compute_nullable(items, occurrences)
+        firsts = _compute_firsts(items, nullable)
+        follows = _compute_follows(items, occurrences, firsts, nullable)
+        names = lambda sets, nt: {t.s for t in symtab.terminals_of(sets[symtab.ids[NonTerminal(nt)]])}
+        assert {symtab.symbols[nt].s for nt in nullable} == {"E'", "T'"}
+        assert names(firsts, "E") == {"(", "id"}
+        assert names(firsts, "E'") == {"+"}
+        assert names(firsts, "T'") == {"*"}
+        assert names(follows, "E") == {")", "eof"}
+        assert names(follows, "E'") == {")", "eof"}
+        assert names(follows, "T") == {"+", ")", "eof"}
+        assert names(follows, "F") == {"+", "*", ")", "eof"}
+
+    def test_parse_epsilon(self):
+        toks = ["id", "+", "id", "*", "(", "id", "+", "id", ")"]
+        for mode in (SLR, LALR, LR1):
+            g = grammar(ll_rules(), [], NameMatcher(), mode=mode)
+            assert g.parse(iter(toks), tranx=True) == ("+", "id", ("*", "id", ("+", "id", "id")))
+
+    def test_mutual_recursion(self):
+        # FOLLOW(L) and FOLLOW(R) depend on each other
+        with self.assertRaisesRegex(Exception, "SHIFT-REDUCE"):
+            grammar(assign_rules(), [], NameMatcher(), mode=SLR)
+
+class TestSymbolTable(TestCase):
+    def test_ids(self):
+        rules = [Rule(i, *r) for (i, r) in enumerate(arith_rules())]
+        symtab = SymbolTable(rules)
+        assert symtab.symbols[0] == EOF
+        assert [symtab.ids[sym] for sym in symtab.symbols] == list(range(len(symtab)))
+        assert sorted(symtab.terminals_of(symtab.mask([PLUS, EOF, VAL]))) == sorted([PLUS, EOF, VAL])
+        # appending rules keeps the ids
+        more = SymbolTable(rules + [Rule(len(rules), V, [Terminal("-"), V])])
+        assert more.symbols[:len(symtab)] == symtab.symbols
+
+class TestStates(TestCase):
+    def test_kernels(self):
+        g = grammar(arith_rules(), [], NameMatcher())
+        items = g.states.items
+        assert g.states.kernels[0] == (items.item(g.rules[0]),)
+        for kernel in g.states.kernels[1:]:
+            assert all(items.pos_of[item] > 0 for item in kernel)
+        assert len(set(g.states.kernels)) == len(g.states)
+
+    def test_print_states(self):
+        g = grammar(arith_rules(), [], NameMatcher())
+        lines = states_str(g).splitlines()
+        assert lines[:2] == ["STATE[0]", "  G := ! S, eof"]
+        assert "  S := S, +! P" in lines
+
+class TestCompactTable(TestCase):
+    def test_entries(self):
+        for (rules, mode) in [(arith_rules(), SLR), (assign_rules(), LALR), (lr1_rules(), LR1), (ll_rules(), SLR)]:
+            g = grammar(rules, [], NameMatcher(), mode=mode)
+            c = CompactTable(g.table, g.symbols, g.rules)
+            assert len(c) == len(g.table)
+            for i in range(len(g.table)):
+                (actions, gotos) = g.table[i]
+                for (sym, act) in actions.items():
+                    assert c.action(i, sym) == act
+                for (sym, dst) in gotos.items():
+                    assert c.goto(i, sym) == dst
+                (c_actions, c_gotos) = c[i]
+                assert c_gotos == gotos
+                assert {**{sym: c.default(i) for sym in actions}, **c_actions} == actions
+
+    def test_parse(self):
+        for (rules, matcher, mode, toks) in [
+            (arith_rules(), ArithKindMatcher(), SLR, ARITH),
+            (assign_rules(), NameMatcher(), LALR, ["*", "id", "=", "*", "*", "id"]),
+            (lr1_rules(), NameMatcher(), LR1, ["b", "x", "d"]),
+            (ll_rules(), NameMatcher(), SLR, ["id", "+", "id", "*", "(", "id", "+", "id", ")"]),
+        ]:
+            g = grammar(rules, [], matcher, mode=mode)
+            c = grammar(rules, [], matcher, mode=mode, compact=True)
+            assert c.parse(iter(toks), tranx=True) == g.parse(iter(toks), tranx=True)
+            assert apply_tranx(c.parse(iter(toks))) == apply_tranx(g.parse(iter(toks)))
+
+    def test_parse_error(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher(), compact=True)
+        eager = grammar(arith_rules(), [], ArithKindMatcher())
+        for toks in (["1", "+", "+"], ["1", "?"], ["(", "1"], ["1", "1"], ["(", "1", "x", "2", "2"]):
+            with self.assertRaises(ParseError) as err:
+                g.parse(iter(toks))
+            with self.assertRaises(ParseError) as expected:
+                eager.parse(iter(toks))
+            # the default reductions don't shrink the expected terminals
+            assert (err.exception.pos, err.exception.expected) == (expected.exception.pos, expected.exception.expected)
+        with self.assertRaises(Exception):
+            grammar(arith_rules(), [], ArithMatcher(), compact=True)
+
+    def test_print(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            grammar(arith_rules(), [], ArithKindMatcher(), compact=True).print_parsing_table()
+        assert len(out.getvalue().splitlines()) == 2 + len(grammar(arith_rules(), [], ArithKindMatcher()).table)
+
+    def test_columns_without_entries(self):
+        # Z sorts after A and never has a goto, the reduce on a is a default
+        (Z, A, a) = (NonTerminal("Z"), NonTerminal("A"), Terminal("a"))
+        g = grammar([(Z, [A, EOF], lambda p: p[0]), (A, [a], lambda p: p[0])], [], NameMatcher(), compact=True)
+        assert g.parse(iter(["a"]), tranx=True) == "a"
+        with self.assertRaises(ParseError):
+            g.parse(iter(["a", "a"]))
+        errors = []
+        g.parse(iter(["a", "a"]), errors=errors)
+        assert [e.pos for e in errors] == [1]
+        for i in range(len(g.table)):
+            assert g.table.goto(i, Z) is None
+        with contextlib.redirect_stdout(io.StringIO()):
+            g.print_parsing_table()
+
+class TestErrorRecovery(TestCase):
+    def test_raise(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        with self.assertRaises(ParseError) as cm:
+            g.parse(iter(["1", "+", ")"]))
+        assert cm.exception.pos == 2
+        assert cm.exception.token == ")"
+        assert cm.exception.expected == sorted([LPAREN, VAL])
+
+    def test_collect(self):
+        toks = ["1", "+", "+", "2", "x", "(", "3", "x", ")", "+", "4"]
+        for compact in (False, True):
+            g = grammar(arith_rules(), [], ArithKindMatcher(), compact=compact)
+            errors = []
+            res = g.parse(iter(toks), errors=errors)
+            assert [(e.pos, e.token) for e in errors] == [(2, "+"), (8, ")")]
+            assert errors[0].expected == sorted([LPAREN, VAL])
+            # the parse went on past both errors
+            assert res.rule == g.rules[1] and apply_tranx(res.children[2]) == 4
+            errors = []
+            assert g.parse(iter(toks), tranx=True, errors=errors) is errors[0]
+
+    def test_no_errors(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        errors = []
+        assert g.parse(iter(ARITH), tranx=True, errors=errors) == ("+", 34, ("x", 12, ("+", 88, 1)))
+        assert errors == []
+
+    def test_discard(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        errors = []
+        g.parse(iter(["1", "?", "?", "+", "2"]), errors=errors)
+        # consecutive skipped tokens are one error
+        assert [(e.pos, e.token) for e in errors] == [(1, "?")]
+
+    def test_eof(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        for toks in (["(", "1"], ["+"], []):
+            errors = []
+            g.parse(iter(toks), errors=errors)
+            assert errors and errors[-1].token is None
+
+class TestNode(TestCase):
+    def test_deep(self):
+        # deeper than the recursion limit
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        toks = ["1"] + ["+", "1"] * 20000
+        res = g.parse(iter(toks))
+        assert isinstance(res, Node)
+        (rule, children) = res
+        assert rule == g.rules[1] and len(children) == 3
+        val = apply_tranx(res)
+        depth = 0
+        while isinstance(val, tuple):
+            (_, val, _) = val
+            depth += 1
+        assert (depth, val) == (20000, 1)
+
+    def test_print_deep(self):
+        # output is quadratic in the depth, keep it small
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            print_parsed(g.parse(iter(["1"] + ["+", "1"] * 1500)))
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "S"
+        assert sum(1 for line in lines if line.strip() == "+") == 1500
+
+def keyed_table(g):
+    # rows keyed by state kernels, comparable across state numberings
+    kernels = g.states.kernels
+
+    def _act(act):
+        return act if isinstance(act, Rule) or act == -1 else kernels[act]
+
+    return {
+        kernels[i]: (
+            {sym: _act(act) for (sym, act) in g.table[i][0].items()},
+            {sym: kernels[dst] for (sym, dst) in g.table[i][1].items()},
+        )
+        for i in range(len(g.table))
+    }
+
+class TestLazy(TestCase):
+    def test_parse(self):
+        for (rules, matcher, mode, toks) in [
+            (arith_rules(), ArithKindMatcher(), SLR, ARITH),
+            (arith_rules(), ArithMatcher(), SLR, ARITH),
+            (lr1_rules(), NameMatcher(), LR1, ["b", "x", "d"]),
+            (ll_rules(), NameMatcher(), LR1, ["id", "+", "id", "*", "(", "id", "+", "id", ")"]),
+        ]:
+            g = grammar(rules, [], matcher, mode=mode)
+            lazy = grammar(rules, [], matcher, mode=mode, lazy=True)
+            assert len(lazy.table.rows) == 0
+            assert lazy.parse(iter(toks), tranx=True) == g.parse(iter(toks), tranx=True)
+
+    def test_partial(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher(), lazy=True)
+        g.parse(iter(["1", "+", "2"]))
+        n_states = len(grammar(arith_rules(), [], ArithKindMatcher()).states)
+        assert len(g.table.rows) < n_states
+        # a multiplication reaches further
+        built = len(g.table.rows)
+        g.parse(iter(["1", "x", "2"]))
+        assert len(g.table.rows) > built
+
+    def test_complete(self):
+        for (rules, mode) in [(arith_rules(), SLR), (assign_rules(), LR1), (lr1_rules(), LR1)]:
+            g = grammar(rules, [], NameMatcher(), mode=mode)
+            lazy = grammar(rules, [], NameMatcher(), mode=mode, lazy=True)
+            lazy.table.complete()
+            assert len(lazy.table.rows) == len(g.states)
+            assert keyed_table(lazy) == keyed_table(g)
+
+    def test_conflict(self):
+        # raised when the conflicting state is reached
+        A = NonTerminal("A")
+        rules = [
+            (G, [S, EOF], lambda p: p[0]),
+            (S, [VAL], lambda p: p[0]),
+            (S, [LPAREN, A, RPAREN], lambda p: p[1]),
+            (A, [A, PLUS, A], lambda p: p),
+            (A, [VAL], lambda p: p[0]),
+        ]
+        g = grammar(rules, [], NameMatcher(), lazy=True)
+        assert g.parse(iter(["val"]), tranx=True) == "val"
+        with self.assertRaisesRegex(Exception, "SHIFT-REDUCE"):
+            g.parse(iter(["(", "val", "+", "val", "+", "val", ")"]))
+
+    def test_errors(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher(), lazy=True)
+        errors = []
+        g.parse(iter(["1", "+", "+", "2"]), errors=errors)
+        assert [(e.pos, e.token) for e in errors] == [(2, "+")]
+        with self.assertRaises(Exception):
+            grammar(arith_rules(), [], ArithKindMatcher(), mode=LALR, lazy=True)
+
+class TestExtend(TestCase):
+    NEG = Terminal("-")
+    (Q, COLON) = (Terminal("?"), Terminal(":"))
+
+    def check(self, rules, more, op_defs=[], more_op_defs=[], **kwargs):
+        g = grammar(rules, op_defs, NameMatcher(), **kwargs)
+        ext = g.extend(more, more_op_defs)
+        full = grammar(rules + more, op_defs + more_op_defs, NameMatcher(), **kwargs)
+        assert [str(r) for r in ext.rules] == [str(r) for r in full.rules]
+        assert set(ext.states.kernels) == set(full.states.kernels)
+        assert keyed_table(ext) == keyed_table(full)
+        kernels = lambda g: {
+            (g.states.kernels[i], sym): {act if isinstance(act, Rule) else g.states.kernels[act] for act in acts}
+            for (i, row) in g.conflicts.items() for (sym, acts) in row.items()
+        }
+        assert kernels(ext) == kernels(full)
+        return ext
+
+    def test_slr(self):
+        ext = self.check(arith_rules(), [(V, [self.NEG, V], lambda p: -p[1])])
+        res = ext.parse(iter(["-", "val", "x", "val"]))
+        assert str(res.rule) == "S := P"
+
+    def test_modes(self):
+        more = [(V, [self.NEG, V], lambda p: p), (S, [S, self.Q, S], lambda p: p)]
+        for mode in (SLR, LALR, LR1):
+            self.check(arith_rules(), more, mode=mode, glr=True)
+            self.check(arith_rules(), more, [], [(LeftAssoc, [self.Q, PLUS])], mode=mode)
+        self.check(assign_rules(), [(NonTerminal("L"), [LPAREN, NonTerminal("R"), RPAREN], lambda p: p[1])], mode=LALR)
+
+    def test_new_nonterminal(self):
+        A = NonTerminal("A")
+        self.check(arith_rules(), [
+            (V, [self.Q, A, self.COLON], lambda p: p[1]),
+            (A, [A, PLUS, VAL], lambda p: p),
+            (A, [VAL], lambda p: p[0]),
+        ])
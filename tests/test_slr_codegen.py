@@ -0,0 +1,87 @@
+import importlib.util
+import os
+import tempfile
+from unittest.case import TestCase
+
+from slang.slr import EOF, NonTerminal, ParseError, Terminal, grammar
+from slang.slr_codegen import bind
+from slang.slr_impl import apply_tranx
+from slang.sysf.grammar import mk_grammar
+from slang.sysf.lexer import lex
+from tests.test_slr import ARITH, ArithKindMatcher, ArithMatcher, arith_rules, ll_rules, NameMatcher
+
+def load_source(name: str, src: str):
+    d = tempfile.mkdtemp()
+    path = os.path.join(d, F"{name}.py")
+    with open(path, "w") as f:
+        f.write(src)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class TestCodegen(TestCase):
+    def test_arith(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        parse = bind(load_source("arith_parser", g.generate_module()), g.rules, g.matcher)
+        assert parse(ARITH) == g.parse(iter(ARITH), tranx=True)
+
+    def test_cst(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        parse = bind(load_source("arith_parser", g.generate_module()), g.rules, g.matcher, tranx=False)
+        assert apply_tranx(parse(ARITH)) == apply_tranx(g.parse(iter(ARITH)))
+
+    def test_epsilon(self):
+        g = grammar(ll_rules(), [], NameMatcher())
+        parse = bind(load_source("ll_parser", g.generate_module()), g.rules, g.matcher)
+        toks = ["id", "+", "id", "*", "id"]
+        assert parse(toks) == g.parse(iter(toks), tranx=True)
+
+    def test_sysf(self):
+        g = mk_grammar()
+        parse = bind(load_source("sysf_parser", g.generate_module()), g.rules, g.matcher)
+        s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)"
+        assert parse(lex(s)) == g.parse(iter(lex(s)), tranx=True)
+
+    def test_compact(self):
+        g = mk_grammar(compact=True)
+        parse = bind(load_source("sysf_parser", g.generate_module()), g.rules, g.matcher)
+        s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)"
+        assert parse(lex(s)) == g.parse(iter(lex(s)), tranx=True) == mk_grammar().parse(iter(lex(s)), tranx=True)
+        # errors where the uncompressed table has them
+        with self.assertRaises(ParseError) as err:
+            parse(lex("(/x:0.x x"))
+        with self.assertRaises(ParseError) as expected:
+            mk_grammar().parse(iter(lex("(/x:0.x x")))
+        assert (err.exception.pos, err.exception.expected) == (expected.exception.pos, expected.exception.expected)
+
+    def test_errors(self):
+        g = grammar(arith_rules(), [], ArithKindMatcher())
+        module = load_source("arith_parser", g.generate_module())
+        parse = bind(module, g.rules, g.matcher)
+        for toks in [["1", "+"], ["1", "1"], ["?"], [], ["(", "1", ")", ")"]]:
+            with self.assertRaises(ParseError) as err:
+                parse(toks)
+            with self.assertRaises(ParseError) as expected:
+                g.parse(iter(toks))
+            e = err.exception
+            assert (e.pos, e.token, e.expected) == (
+                expected.exception.pos, expected.exception.token, expected.exception.expected), toks
+            assert str(e) == str(expected.exception)
+        # standalone, the module's own ParseError with terminal names
+        with self.assertRaises(module.ParseError) as err:
+            module.parse(["1", "1"], g.matcher.token_kind, {}, g.rules)
+        assert (err.exception.pos, err.exception.token) == (0, "1")
+        with self.assertRaises(Exception):
+            bind(module, g.rules[:-1], g.matcher)
+        with self.assertRaises(Exception):
+            bind(module, g.rules, ArithMatcher())
+
+    def test_compact_columns_without_entries(self):
+        (Z, A, a) = (NonTerminal("Z"), NonTerminal("A"), Terminal("a"))
+        g = grammar([(Z, [A, EOF], lambda p: p[0]), (A, [a], lambda p: p[0])], [], NameMatcher(), compact=True)
+        parse = bind(load_source("za_parser", g.generate_module()), g.rules, g.matcher)
+        assert parse(["a"]) == "a"
+        with self.assertRaises(ParseError) as err:
+            parse(["a", "a"])
+        assert (err.exception.pos, err.exception.token, err.exception.expected) == (1, "a", [EOF])
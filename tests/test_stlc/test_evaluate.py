@@ -1,10 +1,17 @@
 from slang.slr_impl import apply_tranx
 from slang.stlc.lexer import lex
-from slang.stlc.grammar import mk_grammar
+from slang.stlc.grammar import DbiParser, mk_grammar
 from slang.stlc.syntax import Arrow, Term, Unit, UnitTy, VarStr, Var, Lam, to_dbi
-from slang.stlc.evaluate import EmptyEnv, EvalException, StopEvalException, TypeException, type_of, evaluate, CEK
+from slang.stlc.evaluate import EmptyEnv, EvalException, StopEvalException, TypeException, type_of, evaluate, evaluate_compiled, compile_term, CEK
+from slang.stlc.vm import evaluate_vm
 from unittest.case import TestCase
 
+N = "(0->0)->0->0"
+C2 = "(/f:0->0.(/x:0.f (f x)))"
+C3 = "(/f:0->0.(/x:0.f (f (f x))))"
+MULT = F"(/m:{N}.(/n:{N}.(/f:0->0.m (n f))))"
+PLUS = F"(/m:{N}.(/n:{N}.(/f:0->0.(/x:0.m f (n f x)))))"
+
 class TestSTLCEvaluate(TestCase):
     def setUp(self):
         self.g = mk_grammar()
@@ -55,6 +62,25 @@ class TestSTLCEvaluate(TestCase):
     def test_eval_2(self):
         assert evaluate(self.parse("(/x:0->0.x)(/x:0.0)"), EmptyEnv()) == self.parse("(/x:0.0)")
 
+    def test_eval_compiled(self):
+        for s in [
+            "0", "(/x:0.x)0", "(/x:0->0.x)(/x:0.0)", "(/x:0->0.x 0)(/x:0.0)",
+            F"{MULT} {C2} {C3}", F"{PLUS} {C2} {C3}", F"{MULT} {C2} {C3} (/x:0.x) 0",
+            F"{MULT} ({PLUS} {C2} {C3}) {C3} (/x:0.x)",
+        ]:
+            t = self.parse(s)
+            assert evaluate_compiled(t) == evaluate(t, EmptyEnv()), s
+
+    def test_compiled_depth(self):
+        # compiling doesn't recurse, deep terms run on the VM
+        deep = lambda k: "(/f:0->0.(/x:0." + "f (" * k + "x" + ")" * k + ")) (/x:0.x) 0"
+        parser = DbiParser()
+        t = parser.parse(iter(lex(deep(200).replace("/", "\\"))))
+        assert evaluate_compiled(t) == Unit()
+        t = parser.parse(iter(lex(deep(2000).replace("/", "\\"))))
+        compile_term(t)
+        assert evaluate_vm(t) == Unit()
+
     def test_cek_eval_1(self):
         t = self.parse("(/x:0->0.x)(/x:0.0)")
         cek = CEK(t)
@@ -70,3 +96,33 @@ class TestSTLCEvaluate(TestCase):
         assert self.cek_eval(self.parse("0")) == self.parse("0")
         assert self.cek_eval(self.parse("(/x:0->0.x 0)(/x:0.0)")) == self.parse("0")
         # assert self.cek_eval(self.parse("0")) == self.parse("0")
+
+    def test_cek_run(self):
+        for s in ["0", "(/x:0->0.x 0)(/x:0.0)", F"{MULT} {C2} {C3}", F"{MULT} ({PLUS} {C2} {C3}) {C3} (/x:0.x) 0"]:
+            t = self.parse(s)
+            stepped = CEK(t)
+            expected = self.cek_eval(t)
+            assert CEK(t).run() == expected
+            ran = CEK(t)
+            while (res := ran.run(7)) is None:
+                assert ran.steps % 7 == 0
+            assert res == expected
+            try:
+                while True:
+                    stepped.step()
+            except StopEvalException:
+                pass
+            assert (ran.steps, ran.allocs) == (stepped.steps, stepped.allocs)
+
+    def test_cek_stuck(self):
+        # no transition applies to unit applied, both stop there
+        for max_steps in [None, 1000]:
+            cek = CEK(self.parse("0 0"))
+            with self.assertRaises(StopEvalException):
+                cek.run(max_steps)
+            assert (cek.c, cek.steps) == (Unit(), 1)
+        cek = CEK(self.parse("0 0"))
+        with self.assertRaises(StopEvalException):
+            for _ in range(1000):
+                cek.step()
+        assert (cek.c, cek.steps) == (Unit(), 1)
@@ -1,6 +1,6 @@
-from slang.stlc.grammar import mk_grammar
-from slang.stlc.syntax import Arrow, Unit, UnitTy, VarStr, Lam, App
-from slang.stlc.lexer import lex
+from slang.stlc.grammar import DbiParser, mk_grammar
+from slang.stlc.syntax import Arrow, Unit, UnitTy, Var, VarStr, Lam, App, to_dbi
+from slang.stlc.lexer import lex, LAM, VAR, COLON, UNIT, ARROW, DOT
 from slang.slr import apply_tranx, print_parsed
 from unittest.case import TestCase
 
@@ -21,3 +21,28 @@ class TestSTLCGrammar(TestCase):
         U = UnitTy()
         u = Unit()
         assert apply_tranx(res) == App(Lam("x", Arrow(U, U), App(VarStr('x'), u)), Lam("x", U, VarStr('x')))
+
+    def test_parse_tranx(self):
+        g = mk_grammar()
+        toks = lex("(\\x:0->0.x 0)(\\x:0.x)")
+        assert g.parse(iter(toks), tranx=True) == apply_tranx(g.parse(iter(toks)))
+
+    def test_parse_deep_stack(self):
+        g = mk_grammar()
+        n = 10000
+        toks = [LAM, VAR("x"), COLON] + [UNIT, ARROW] * n + [UNIT, DOT, VAR("x")]
+        res = g.parse(iter(toks), tranx=True)
+        ty = res.ty
+        for _ in range(n):
+            assert isinstance(ty, Arrow)
+            ty = ty.dst
+        assert ty == UnitTy()
+
+    def test_dbi(self):
+        g = mk_grammar()
+        p = DbiParser(compact=True)
+        for s in ["(\\x:0->0.x 0)(\\x:0.x)", "(\\x:0.(\\y:0->0.y x)) (\\x:0.(\\x:0.x) x)"]:
+            assert p.parse(iter(lex(s))) == to_dbi(g.parse(iter(lex(s)), tranx=True))
+        with self.assertRaises(Exception):
+            p.parse(iter(lex("(\\x:0.y)")))
+        assert p.parse(iter(lex("(\\y:0.y)"))) == Lam("y", UnitTy(), Var(0))
@@ -0,0 +1,49 @@
+from unittest.case import TestCase
+
+from slang.stlc.evaluate import EmptyEnv, EvalException, evaluate
+from slang.stlc.grammar import DbiParser
+from slang.stlc.lexer import lex
+from slang.stlc.vm import compile_program, disassemble, evaluate_vm, run
+from tests.test_stlc.test_evaluate import C2, C3, MULT, PLUS
+
+class TestVM(TestCase):
+    def setUp(self):
+        self.parser = DbiParser()
+
+    def parse(self, s):
+        return self.parser.parse(iter(lex(s.replace("/", "\\"))))
+
+    def test_evaluate(self):
+        for s in [
+            "0", "(/x:0.x)0", "(/x:0->0.x)(/x:0.0)", "(/x:0->0.x 0)(/x:0.0)",
+            F"{MULT} {C2} {C3}", F"{PLUS} {C2} {C3}", F"{MULT} {C2} {C3} (/x:0.x) 0",
+            F"{MULT} ({PLUS} {C2} {C3}) {C3} (/x:0.x)",
+        ]:
+            t = self.parse(s)
+            assert evaluate_vm(t) == evaluate(t, EmptyEnv()), s
+
+    def test_disassemble(self):
+        prog = compile_program(self.parse("(/x:0->0.x 0)(/y:0.y)"))
+        assert disassemble(prog).split("\n") == [
+            "    0  CLOSURE   6",
+            "    2  CLOSURE   10",
+            "    4  APPLY",
+            "    5  STOP",
+            "\\x:",
+            "    6  ACCESS    0",
+            "    8  UNIT",
+            "    9  TAILAPPLY",
+            "\\y:",
+            "   10  ACCESS    0",
+            "   12  RETURN",
+        ]
+
+    def test_deep(self):
+        # neither compiling nor running recurses
+        k = 5000
+        c = "(/f:0->0.(/x:0." + "f (" * k + "x" + ")" * k + "))"
+        assert evaluate_vm(self.parse(F"{c} (/x:0.x) 0")) == self.parse("0")
+
+    def test_stuck(self):
+        with self.assertRaises(EvalException):
+            run(compile_program(self.parse("0 0")))
@@ -1,10 +1,11 @@
 from slang.slr_impl import apply_tranx
+import tempfile
 import unittest
 from slang.sysf.lexer import (
     lex,
     Token, LAMBDA, DOT, COLON, LPAREN, RPAREN, IDENT
 )
-from slang.sysf.grammar import mk_grammar
+from slang.sysf.grammar import DbiParser, mk_grammar
 from slang.sysf.syntax import to_dbi
 from slang.sysf.typecheck import typeof
 
@@ -51,6 +52,20 @@ class TestGrammar(unittest.TestCase):
     def test_tapp(self):
         self.parse("(/id:@T.T->T.id[0]0)(@T./x:T.x)")
 
+    def test_tranx(self):
+        g = mk_grammar()
+        s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)"
+        assert g.parse(iter(lex(s)), tranx=True) == self.parse(s)
+
+class TestTokenSubclass(unittest.TestCase):
+    def test_subclass(self):
+        # tokens of a subclass match their parent's terminal
+        class QUOTED(IDENT): ...
+        toks = [QUOTED(t.s) if isinstance(t, IDENT) and t.s == "x" else t for t in lex("(/id:@T.T->T.id[0]0)(@T./x:T.x)")]
+        expected = mk_grammar().parse(iter(lex("(/id:@T.T->T.id[0]0)(@T./x:T.x)")), tranx=True)
+        for g in [mk_grammar(), mk_grammar(compact=True)]:
+            assert g.parse(iter(toks), tranx=True) == expected
+
 class TestSyntax(unittest.TestCase):
     def setUp(self):
         self.parse = mk_parse_dbi()
@@ -58,6 +73,15 @@ class TestSyntax(unittest.TestCase):
     def test_to_dbi(self):
         print(self.parse("(/id:@T.T->T.id[0]0)(@T./x:T.x)"))
 
+    def test_fused(self):
+        p = DbiParser()
+        for s in [
+            "(/id:@T.T->T.id[0]0)(@T./x:T.x)",
+            "@T./x:T.@U./y:U->T.y x z",
+            "(@T./x:@S.S->T.x)[@T.T->T]",
+        ]:
+            assert p.parse(iter(lex(s))) == self.parse(s)
+
 class TestTypeChecker(unittest.TestCase):
     def setUp(self):
         self.parse = mk_parse_dbi()
@@ -71,3 +95,12 @@ class TestTypeChecker(unittest.TestCase):
     def test_type_check_2(self):
         print(typeof(self.parse("(@T./x:T.x)[@T.T->T]")))
 
+
+class TestGrammarCache(unittest.TestCase):
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as d:
+            g1 = mk_grammar(d)
+            g2 = mk_grammar(d)
+            assert g1.table == g2.table
+            s = "(/id:@T.T->T.id[0]0)(@T./x:T.x)"
+            assert apply_tranx(g2.parse(iter(lex(s)))) == apply_tranx(g1.parse(iter(lex(s))))